@@ -0,0 +1,184 @@
+#################################################################################################
+#################################################################################################
+'''
+    Cheap page triage before full-resolution OCR (replaces steps 0 and 1 for large documents).
+
+    Step 2 discards every page whose text lacks one of the TABLE_HEADERS, but only after the page
+    was rasterized at 300 DPI and fully OCR'd. Triage first probes each page cheaply:
+        1. the PDF text layer, when the page has one (pdfplumber, no rendering at all);
+        2. otherwise a low-DPI grayscale thumbnail (optionally cropped to the header band) run
+           through Tesseract and fuzzily matched against the header catalog.
+    Only matching pages are rendered at full resolution into a page store (see page_store.py;
+    reused when the PDF and kept pages are unchanged) and OCR'd into page_<n>.txt, so step 1.1
+    picks up exactly where it would after step 1.
+
+    Parameters:
+        pdf_path (str): Path to the input PDF file.
+        store_folder (str): Folder for the page store of the kept pages.
+        text_folder (str): Folder for the OCR text of the kept pages.
+        dpi (int): Full-resolution DPI (default: 300).
+        thumbnail_dpi (int): DPI of the triage thumbnail (default: 100).
+        header_band (float): Fraction of the page height probed from the top (default: 1.0,
+                             the whole page; e.g. 0.3 when tables always start at the top).
+        match_threshold (int): Minimum fuzzy partial-match score for a header (default: 85).
+
+    Returns:
+        dict: Page counts, triage vs full-resolution time and the estimated time saved.
+'''
+#################################################################################################
+#################################################################################################
+
+import os
+import time
+
+import pdfplumber
+import pytesseract
+from fuzzywuzzy import fuzz
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from page_store import PageStore, PageStoreWriter, is_valid_store, store_path_for, tesseract_image
+from profiling import profile_stage, increment, get_logger
+from stages import load_stage
+
+logger = get_logger(__name__)
+
+TABLE_HEADERS = load_stage("2_classified_tables_headers.py").TABLE_HEADERS
+
+# Pages without a text layer are rendered for triage in runs of at most this many consecutive
+# pages, to bound memory on long documents
+THUMBNAIL_BATCH = 20
+# A text layer shorter than this is treated as missing (scans often carry a stray stamp or page number)
+MIN_TEXT_LAYER_CHARS = 20
+
+
+def match_header(text, threshold=85):
+    """
+    Returns the first TABLE_HEADERS key found in `text`, tolerating OCR noise, or None.
+    """
+    text = " ".join(text.upper().split())
+    for header in TABLE_HEADERS:
+        if header in text or fuzz.partial_ratio(header, text) >= threshold:
+            return header
+    return None
+
+
+def probe_text_layer(pdf_path):
+    """
+    Reads the embedded text of each page.
+
+    Returns:
+        list: Page text, or None for pages without a usable text layer.
+    """
+    texts = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ""
+            texts.append(text if len(text.strip()) >= MIN_TEXT_LAYER_CHARS else None)
+    return texts
+
+
+def _page_runs(pages, max_length):
+    """
+    Splits sorted page numbers into (first, last) runs of consecutive pages, each at most
+    `max_length` long, so rendering a run never touches a page outside `pages`.
+    """
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1 and page - runs[-1][0] < max_length:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return [tuple(run) for run in runs]
+
+
+@profile_stage
+def triage_pages(pdf_path, thumbnail_dpi=100, header_band=1.0, match_threshold=85):
+    """
+    Decides which pages can contain a relevant table.
+
+    Returns:
+        tuple: (sorted kept 1-based page numbers, total pages, pages probed via the text layer)
+    """
+    num_pages = pdfinfo_from_path(pdf_path)["Pages"]
+    text_layer = probe_text_layer(pdf_path)
+
+    kept, text_layer_pages = [], 0
+    ocr_pages = [page for page in range(1, num_pages + 1) if text_layer[page - 1] is None]
+    for page in range(1, num_pages + 1):
+        if text_layer[page - 1] is not None:
+            text_layer_pages += 1
+            if match_header(text_layer[page - 1], match_threshold):
+                kept.append(page)
+
+    for first_page, last_page in _page_runs(ocr_pages, THUMBNAIL_BATCH):
+        thumbnails = convert_from_path(pdf_path, dpi=thumbnail_dpi, grayscale=True,
+                                       first_page=first_page, last_page=last_page)
+        for page, thumbnail in zip(range(first_page, last_page + 1), thumbnails):
+            if header_band < 1.0:
+                thumbnail = thumbnail.crop((0, 0, thumbnail.width, int(thumbnail.height * header_band)))
+            if match_header(pytesseract.image_to_string(thumbnail), match_threshold):
+                kept.append(page)
+
+    increment("pages", num_pages)
+    increment("textLayerPages", text_layer_pages)
+    increment("keptPages", len(kept))
+    return sorted(kept), num_pages, text_layer_pages
+
+
+@profile_stage
+def ocr_kept_pages(pdf_path, pages, store_folder, text_folder, dpi=300):
+    """
+    Renders the kept pages at full resolution into a page store and OCRs them.
+
+    Returns:
+        str: Path of the page store.
+    """
+    os.makedirs(text_folder, exist_ok=True)
+
+    store_path = store_path_for(pdf_path, store_folder, dpi, pages=pages)
+    if not is_valid_store(store_path):
+        with PageStoreWriter(store_path, metadata={"source": pdf_path, "dpi": dpi}) as writer:
+            for page in pages:
+                writer.add_page(convert_from_path(pdf_path, dpi=dpi, grayscale=True, first_page=page, last_page=page)[0], page)
+
+    with PageStore(store_path) as store:
+        for page, pixels in store.iter_pages():
+            with open(os.path.join(text_folder, f"page_{page}.txt"), "w") as text_file:
+                text_file.write(pytesseract.image_to_string(tesseract_image(pixels)))
+            increment("pages")
+            logger.info("Processed page %s -> %s/page_%s.txt", page, text_folder, page)
+
+    return store_path
+
+
+def triage_and_ocr(pdf_path, store_folder, text_folder, dpi=300, thumbnail_dpi=100, header_band=1.0,
+                   match_threshold=85):
+    start = time.perf_counter()
+    kept, num_pages, text_layer_pages = triage_pages(pdf_path, thumbnail_dpi, header_band, match_threshold)
+    triage_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ocr_kept_pages(pdf_path, kept, store_folder, text_folder, dpi)
+    full_seconds = time.perf_counter() - start
+
+    skipped = num_pages - len(kept)
+    # Skipped pages would each have cost about as much as a kept page at full resolution
+    per_page_seconds = full_seconds / len(kept) if kept else 0.0
+    report = {
+        "pages": num_pages,
+        "kept": len(kept),
+        "skipped": skipped,
+        "textLayerPages": text_layer_pages,
+        "triageSeconds": triage_seconds,
+        "fullResolutionSeconds": full_seconds,
+        "estimatedSecondsSaved": skipped * per_page_seconds - triage_seconds,
+    }
+
+    print(f"Triage of {pdf_path}: kept {len(kept)}/{num_pages} pages, skipped {skipped} "
+          f"({text_layer_pages} probed via text layer); triage {triage_seconds:.1f}s, "
+          f"full-resolution OCR {full_seconds:.1f}s, estimated time saved {report['estimatedSecondsSaved']:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    triage_and_ocr("ark.pdf", "page_stores", "text_outputs", dpi=300)
@@ -1,41 +1,58 @@
 #################################################################################################
 #################################################################################################
 '''
-    Converts a PDF file into images, saving each page as an image in the specified output folder.
+    Converts a PDF file into a page store: a single memory-mapped file holding the raw grayscale
+    pixels of every page (see page_store.py), instead of a new folder of PNGs on every run.
+
+    The store is named after a hash of the PDF contents and the rendering settings, so rerunning
+    on an unchanged PDF reuses the existing store.
 
     Parameters:
         pdf_path (str): Path to the input PDF file.
-        output_folder (str): Path to the output folder for saving images.
+        output_folder (str): Folder the page stores are kept in.
         dpi (int): DPI for the conversion (default: 300).  ---- custom resolution
+        tile_size (int): Store pages as square tiles of this size (default: None, untiled).
+        reuse (bool): Reuse an existing store for the same PDF and settings (default: True).
 
     Returns:
-        None
+        str: Path of the page store (None on failure).
 '''
 #################################################################################################
 #################################################################################################
 
-import os
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from tqdm import tqdm  
-from datetime import datetime
-
-def pdf_to_images(pdf_path, output_folder, dpi=300):
-    # Ensure unique output folder with timestamp to avoid overwriting 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_folder = f"{output_folder}_{timestamp}"
-    os.makedirs(output_folder, exist_ok=True)
-    
+from page_store import PageStoreWriter, is_valid_store, store_path_for
+from profiling import profile_stage, increment
+
+# Pages are rendered in batches so long documents are never held in memory all at once
+RENDER_BATCH = 10
+
+@profile_stage
+def pdf_to_images(pdf_path, output_folder, dpi=300, tile_size=None, reuse=True):
     try:
-        images = convert_from_path(pdf_path, dpi=dpi)  
+        store_path = store_path_for(pdf_path, output_folder, dpi, tile_size)
+        if reuse and is_valid_store(store_path):
+            print(f"PDF unchanged, reusing page store: {store_path}")
+            return store_path
+
+        num_pages = pdfinfo_from_path(pdf_path)["Pages"]
+        with PageStoreWriter(store_path, tile_size, {"source": pdf_path, "dpi": dpi}) as writer:
+            with tqdm(total=num_pages, desc="Converting PDF to page store") as pbar:
+                for first_page in range(1, num_pages + 1, RENDER_BATCH):
+                    last_page = min(first_page + RENDER_BATCH - 1, num_pages)
+                    images = convert_from_path(pdf_path, dpi=dpi, grayscale=True,
+                                               first_page=first_page, last_page=last_page)
+                    for page, image in enumerate(images, start=first_page):
+                        writer.add_page(image, page)
+                        pbar.update(1)
     except Exception as e:
         print(f"Error converting PDF: {e}")
         return
 
-    with tqdm(total=len(images), desc="Converting PDF to images") as pbar:
-        for i, image in enumerate(images):
-            image.save(f"{output_folder}/page_{i + 1}.png", "PNG")
-            pbar.update(1)  
-
-    print(f"PDF converted to images in folder: {output_folder}")
+    increment("pages", num_pages)
+    print(f"PDF converted to page store: {store_path}")
+    return store_path
 
-pdf_to_images("ark.pdf", "output_images", dpi=300)
+if __name__ == "__main__":
+    pdf_to_images("ark.pdf", "page_stores", dpi=300)
@@ -1,6 +1,10 @@
 import re
 import os
+from profiling import profile_stage, increment, get_logger
 
+logger = get_logger(__name__)
+
+@profile_stage
 def clean_text(text):
     """
     Cleans raw OCR text by removing noise and standardizing formatting.
@@ -11,6 +15,8 @@ def clean_text(text):
     Returns:
         str: Cleaned and standardized text.
     """     
+    increment("characters", len(text))
+
     # Remove noise characters (e.g., hyphens, excessive spaces)
     text = re.sub(r"[—_=]+", " ", text)  # Replace dashes and underscores
     text = re.sub(r"\s{2,}", " ", text)   # Replace multiple spaces with one
@@ -66,10 +72,11 @@ def process_and_clean_text_files(input_folder, cleaned_output_folder):
         with open(os.path.join(cleaned_output_folder, file), "w") as f:
             f.write(cleaned_text)
 
-        print(f"Cleaned text saved to {cleaned_output_folder}/{file}")
+        logger.info("Cleaned text saved to %s/%s", cleaned_output_folder, file)
 
 
-input_folder = "text_outputs"  
-cleaned_output_folder = "cleaned_text_outputs"
+if __name__ == "__main__":
+    input_folder = "text_outputs"  
+    cleaned_output_folder = "cleaned_text_outputs"
 
-process_and_clean_text_files(input_folder, cleaned_output_folder)
+    process_and_clean_text_files(input_folder, cleaned_output_folder)
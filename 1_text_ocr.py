@@ -1,10 +1,11 @@
 #################################################################################################
 #################################################################################################
 '''
-    Extracts text from images in the specified folder and saves each as a .txt file.
+    Extracts text from page images and saves each page as a .txt file.
 
     Parameters:
-        image_folder (str): Path to the folder containing the images.
+        image_source (str): Page store written by step 0 (opened via mmap; pages are handed to
+                            Tesseract as uncompressed BMP temp files), or a folder of .png page images.
         output_folder (str): Path to the folder to save text outputs.
 
     Returns:
@@ -16,30 +17,57 @@
 import pytesseract
 from PIL import Image
 import os
+from page_store import PageStore, store_path_for, tesseract_image
+from profiling import profile_stage, increment, get_logger
 
-def extract_text_from_images(image_folder, output_folder):
+logger = get_logger(__name__)
+
+def _ocr_to_file(image, output_text_path):
+    extracted_text = pytesseract.image_to_string(image)
+
+    # Save the extracted text to a file
+    with open(output_text_path, "w") as text_file:
+        text_file.write(extracted_text)
+
+@profile_stage
+def extract_text_from_images(image_source, output_folder):
 
     os.makedirs(output_folder, exist_ok=True)
-    image_files = sorted([f for f in os.listdir(image_folder) if f.endswith('.png')])
+
+    if os.path.isfile(image_source):
+        with PageStore(image_source) as store:
+            for page_number in store.page_numbers:
+                try:
+                    output_text_path = os.path.join(output_folder, f"page_{page_number}.txt")
+                    # pytesseract still writes a temp file for Tesseract; BMP skips the PNG encode/decode
+                    _ocr_to_file(tesseract_image(store.page(page_number)), output_text_path)
+
+                    increment("images")
+                    logger.info("Processed page %s -> %s", page_number, output_text_path)
+                except Exception as e:
+                    increment("errors")
+                    logger.error("Error processing page %s: %s", page_number, e)
+        return
+
+    image_files = sorted([f for f in os.listdir(image_source) if f.endswith('.png')])
 
     for idx, image_file in enumerate(image_files):
         try:
-            image_path = os.path.join(image_folder, image_file)
+            image_path = os.path.join(image_source, image_file)
             output_text_path = os.path.join(output_folder, f"{os.path.splitext(image_file)[0]}.txt")
             
             # Opens the image and apply OCR
             img = Image.open(image_path)
-            extracted_text = pytesseract.image_to_string(img)
-
-            # Save the extracted text to a file
-            with open(output_text_path, "w") as text_file:
-                text_file.write(extracted_text)
+            _ocr_to_file(img, output_text_path)
 
-            print(f"Processed {image_file} -> {output_text_path}")
+            increment("images")
+            logger.info("Processed %s -> %s", image_file, output_text_path)
         except Exception as e:
-            print(f"Error processing {image_file}: {e}")
+            increment("errors")
+            logger.error("Error processing %s: %s", image_file, e)
 
-image_folder = "images"  
-output_folder = "text_outputs" 
+if __name__ == "__main__":
+    image_source = store_path_for("ark.pdf", "page_stores", dpi=300)  # Written by step 0
+    output_folder = "text_outputs" 
 
-extract_text_from_images(image_folder, output_folder)
+    extract_text_from_images(image_source, output_folder)
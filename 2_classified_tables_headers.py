@@ -1,5 +1,6 @@
 import os
 import json
+from profiling import profile_stage, increment
 
 # Define keywords for classification
 TABLE_HEADERS = {
@@ -8,6 +9,7 @@ TABLE_HEADERS = {
     "100-YARD RUSHING GAMES": {"entity": "Player", "statistic": "Rushing Yards", "statPeriod": "Game"}
 }
 
+@profile_stage
 def classify_tables(input_folder, output_folder):
     """
     Classifies tables based on their headers and assigns metadata.
@@ -27,6 +29,8 @@ def classify_tables(input_folder, output_folder):
         with open(file_path, "r") as f:
             text = f.read()
 
+        increment("pages")
+
         # Detect table type based on headers
         metadata = None
         for header, meta in TABLE_HEADERS.items():
@@ -37,6 +41,7 @@ def classify_tables(input_folder, output_folder):
         if metadata:
             # Save relevant text and metadata
             classified_tables.append({"metadata": metadata, "text": text})
+            increment("tables")
 
     output_file = os.path.join(output_folder, "classified_tables.json")
     with open(output_file, "w") as outfile:
@@ -44,7 +49,8 @@ def classify_tables(input_folder, output_folder):
 
     print(f"Classified tables saved to {output_file}")
 
-input_folder = "cleaned_text_outputs" 
-output_folder = "classified_tables"   
+if __name__ == "__main__":
+    input_folder = "cleaned_text_outputs" 
+    output_folder = "classified_tables"   
 
-classify_tables(input_folder, output_folder)
+    classify_tables(input_folder, output_folder)
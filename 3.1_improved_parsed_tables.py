@@ -1,9 +1,13 @@
-from transformers import pipeline
+from ner_backends import load_ner
+from profiling import profile_stage, increment
 import re
 import json
+from functools import partial
+from parallel import PARSE_WORKERS, parse_tables_parallel
 
 # Load pre-trained Named Entity Recognition model
-ner = pipeline("ner", model="dbmdz/bert-large-cased-finetuned-conll03-english", grouped_entities=True)
+# Backend (pytorch / onnx / onnx-int8 / distilled) is picked by NER_BACKEND, see ner_backends.py
+ner = load_ner()
 
 def preprocess_text(text):
     """
@@ -93,10 +97,12 @@ def parse_table_records_with_ner(raw_lines, metadata):
 #         })
     
 #     return {"metadata": metadata, "records": records}
+@profile_stage
 def enhanced_parsing(clean_lines, metadata, team_list):
     """
     Parses records and distinguishes opponent names from team names.
     """
+    increment("lines", len(clean_lines))
     records = []
     for line in clean_lines:
         entities = ner(line)  # Use NER to extract player names and opponents
@@ -132,6 +138,7 @@ def enhanced_parsing(clean_lines, metadata, team_list):
             "rawLine": line
         })
 
+    increment("records", len(records))
     return {"metadata": metadata, "records": records}
 
 
@@ -175,22 +182,17 @@ def post_process_records(parsed_records):
 
     return final_records
 
-with open("team_list.json", "r") as team_file:
-    team_list = json.load(team_file)
-
-
-def process_parsed_tables_with_ner(input_file, output_file, team_list):
+def process_parsed_tables_with_ner(input_file, output_file, team_list, workers=PARSE_WORKERS):
     """
     Processes tables with NER-based parsing and team identification.
+    With workers > 1 the lines are parsed by forked processes sharing the loaded model.
     """
     with open(input_file, "r") as infile:
         parsed_data = json.load(infile)
 
+    tables = [(table["processedLines"], table["metadata"]) for table in parsed_data]
     enhanced_tables = []
-    for table in parsed_data:
-        metadata = table["metadata"]
-        processed_lines = table["processedLines"]
-        parsed_table = enhanced_parsing(processed_lines, metadata, team_list)
+    for parsed_table in parse_tables_parallel(partial(enhanced_parsing, team_list=team_list), tables, workers):
         parsed_table["records"] = post_process_records(parsed_table["records"])
         enhanced_tables.append(parsed_table)
 
@@ -200,7 +202,11 @@ def process_parsed_tables_with_ner(input_file, output_file, team_list):
     print(f"Enhanced parsed tables with team identification saved to {output_file}")
 
 
-input_file = "final_parsed_tables.json"  # Current output file
-output_file = "improved_parsed_tables.json"
+if __name__ == "__main__":
+    with open("team_list.json", "r") as team_file:
+        team_list = json.load(team_file)
+
+    input_file = "final_parsed_tables.json"  # Current output file
+    output_file = "improved_parsed_tables.json"
 
-process_parsed_tables_with_ner(input_file, output_file, team_list)
+    process_parsed_tables_with_ner(input_file, output_file, team_list)
@@ -1,16 +1,24 @@
 import re
 import json
-from transformers import pipeline
+from functools import partial
+from ner_backends import load_ner
+from profiling import profile_stage, increment, get_logger
+from parallel import PARSE_WORKERS, parse_tables_parallel
+
+logger = get_logger(__name__)
 
 # NER Model
-ner = pipeline("ner", model="dbmdz/bert-large-cased-finetuned-conll03-english", grouped_entities=True)
+# Backend (pytorch / onnx / onnx-int8 / distilled) is picked by NER_BACKEND, see ner_backends.py
+ner = load_ner()
 
 # Updated enhanced_parsing
+@profile_stage
 def enhanced_parsing(clean_lines, metadata, team_list):
     """
     Parses records and validates player, opponent, and team classifications,
     including ranking and season extraction.
     """
+    increment("lines", len(clean_lines))
     records = []
     for line in clean_lines:
         entities = ner(line)
@@ -63,6 +71,7 @@ def enhanced_parsing(clean_lines, metadata, team_list):
                 "rawLine": line
             })
 
+    increment("records", len(records))
     return {"metadata": metadata, "records": records}
 
 
@@ -103,17 +112,23 @@ def post_process_records(parsed_records, team_list):
 
 def consolidate_multi_line_records(records):
     """
-    Consolidates records that belong to the same player or team.
+    Consolidates consecutive records that are fragments of the same row. Cross-table and
+    cross-document duplicates are merged by 3.2_deduplicate_records.py.
     """
     consolidated = []
     temp_record = None
     for record in records:
-        if temp_record and record["playerName"] == temp_record["playerName"]:
-            # Merging stats into the same record
-            if record["statValue"]:
-                temp_record["statValue"] += record["statValue"]
+        if (temp_record and record["playerName"] == temp_record["playerName"]
+                and (record["statValue"] is None or temp_record["statValue"] in (None, record["statValue"]))):
+            # Fill the fields the earlier fragment is missing; never add stat values together
+            for field, value in record.items():
+                if field != "extraStats" and temp_record.get(field) is None:
+                    temp_record[field] = value
             if record["extraStats"]:
-                temp_record["extraStats"] = f"{temp_record['extraStats']}, {record['extraStats']}"
+                if temp_record["extraStats"]:
+                    temp_record["extraStats"] = f"{temp_record['extraStats']}, {record['extraStats']}"
+                else:
+                    temp_record["extraStats"] = record["extraStats"]
         else:
             if temp_record:
                 consolidated.append(temp_record)
@@ -132,29 +147,21 @@ def validate_final_output(parsed_tables):
     for table in parsed_tables:
         for record in table["records"]:
             if not record["playerName"]:
-                print(f"Warning: Missing playerName in record: {record}")
+                logger.warning("Missing playerName in record: %s", record)
             if record["teamName"] and record["opponentName"]:
-                print(f"Warning: teamName and opponentName conflict in record: {record}")
-
-with open("team_list.json", "r") as team_file:
-    team_list = json.load(team_file)
-
-player_list_file = "player_list.json"
-with open(player_list_file, "r") as file:
-    player_list = json.load(file)
+                logger.warning("teamName and opponentName conflict in record: %s", record)
 
-def process_parsed_tables_with_ner(input_file, output_file, team_list):
+def process_parsed_tables_with_ner(input_file, output_file, team_list, workers=PARSE_WORKERS):
     """
     Processes tables with enhanced parsing and validation.
+    With workers > 1 the lines are parsed by forked processes sharing the loaded model.
     """
     with open(input_file, "r") as infile:
         parsed_data = json.load(infile)
 
+    tables = [(table["processedLines"], table["metadata"]) for table in parsed_data]
     enhanced_tables = []
-    for table in parsed_data:
-        metadata = table["metadata"]
-        processed_lines = table["processedLines"]
-        parsed_table = enhanced_parsing(processed_lines, metadata, team_list)
+    for parsed_table in parse_tables_parallel(partial(enhanced_parsing, team_list=team_list), tables, workers):
         parsed_table["records"] = post_process_records(parsed_table["records"], team_list)
         enhanced_tables.append(parsed_table)
 
@@ -164,10 +171,18 @@ def process_parsed_tables_with_ner(input_file, output_file, team_list):
     print(f"Enhanced parsed tables saved to {output_file}")
 
 
-input_file = "preprocessed_tables.json"
-output_file = "enhanced_parsed_tables.json"
-team_list = team_list
+if __name__ == "__main__":
+    with open("team_list.json", "r") as team_file:
+        team_list = json.load(team_file)
 
-# Run enhanced parsing
-process_parsed_tables_with_ner(input_file, output_file, team_list)
-print(f"Enhanced parsed tables saved to {output_file}")
+    player_list_file = "player_list.json"
+    with open(player_list_file, "r") as file:
+        player_list = json.load(file)
+
+    input_file = "preprocessed_tables.json"
+    output_file = "enhanced_parsed_tables.json"
+    team_list = team_list
+
+    # Run enhanced parsing
+    process_parsed_tables_with_ner(input_file, output_file, team_list)
+    print(f"Enhanced parsed tables saved to {output_file}")
@@ -1,16 +1,130 @@
+import os
 import re
 import json
-from transformers import pipeline
+from transformers import LogitsProcessor, LogitsProcessorList, pipeline
 import torch
+from profiling import profile_stage, increment, get_logger
+
+logger = get_logger(__name__)
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
 model = pipeline("text2text-generation", model="google/flan-t5-large", device=0 if device == "cuda" else -1)
 
-def extract_from_text_llm(raw_text):
+# "constrained" fills the schema slot by slot with masked logits; "free" asks for a JSON object
+LLM_DECODING = os.environ.get("LLM_DECODING", "constrained")
+
+# Output schema: field -> slot type
+SCHEMA_FIELDS = {
+    "PlayerName": "name",
+    "OpponentName": "name",
+    "StatValue": "number",
+    "Ranking": "number",
+    "Season": "number",
+}
+
+SLOT_QUESTIONS = {
+    "PlayerName": "Which player is named in this record-book line?",
+    "OpponentName": "Which opponent team is named in this record-book line?",
+    "StatValue": "What is the record value, the number right before the player's name?",
+    "Ranking": "What is the ranking, the number followed by a period at the start of the line?",
+    "Season": "In which season year was the record set?",
+}
+
+SLOT_MAX_NEW_TOKENS = {"name": 12, "number": 4}
+
+# A line only counts as a parsed record when these are filled, in either decoding mode
+REQUIRED_FIELDS = ["PlayerName", "StatValue"]
+
+# Running totals for the current process, reported by process_with_llm
+decoding_stats = {"lines": 0, "parsed": 0, "slotsFilled": 0, "tokensGenerated": 0}
+
+# T5 pieces that are pure digits (with or without the word-start marker)
+NUMBER_TOKEN_IDS = [
+    token_id for token, token_id in model.tokenizer.get_vocab().items()
+    if token.lstrip("\u2581").isdigit()
+]
+
+
+class SchemaSlotLogitsProcessor(LogitsProcessor):
     """
-    Uses an LLM to extract structured data from raw text.
+    Restricts every row of a slot-filling batch to the tokens its slot may produce:
+    name slots may only copy tokens of the input line, number slots only digit tokens,
+    and each row is forced to end once it reaches its slot's token budget.
+    """
+
+    def __init__(self, allowed_token_ids, max_new_tokens, eos_token_id):
+        self.allowed_token_ids = allowed_token_ids
+        self.max_new_tokens = max_new_tokens
+        self.eos_token_id = eos_token_id
+
+    def __call__(self, input_ids, scores):
+        generated = input_ids.shape[1] - 1  # the first decoder token is the start token
+        mask = torch.full_like(scores, float("-inf"))
+        for row, allowed in enumerate(self.allowed_token_ids):
+            if generated >= self.max_new_tokens[row]:
+                mask[row, self.eos_token_id] = 0
+            else:
+                mask[row, allowed] = 0
+        return scores + mask
+
+
+def _normalize_slot(field, answer, raw_text):
+    """
+    Validates a slot answer against the schema; returns None when it does not fit.
+    """
+    answer = answer.strip()
+    if SCHEMA_FIELDS[field] == "number":
+        digits = re.sub(r"\D", "", answer)
+        value = int(digits) if digits else None
+        if field == "Season" and value is not None and not 1900 <= value <= 2100:
+            return None
+        if field == "Ranking" and value is not None and value <= 0:
+            return None
+        return value
+
+    # Names must be copied from the line, not invented
+    if not answer or answer.lower() in ("null", "none") or answer.lower() not in raw_text.lower():
+        return None
+    return answer
+
+
+def _extract_constrained(raw_text):
+    """
+    Fills the schema slot by slot in a single batched generate call, one row per field.
     """
+    tokenizer = model.tokenizer
+    prompts = [f"{SLOT_QUESTIONS[field]}\n\nText: {raw_text}\n\nAnswer:" for field in SCHEMA_FIELDS]
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.model.device)
+
+    line_token_ids = sorted(set(tokenizer(raw_text).input_ids) | {tokenizer.eos_token_id})
+    number_token_ids = NUMBER_TOKEN_IDS + [tokenizer.eos_token_id]
+    slot_types = list(SCHEMA_FIELDS.values())
+    processor = SchemaSlotLogitsProcessor(
+        [line_token_ids if slot == "name" else number_token_ids for slot in slot_types],
+        [SLOT_MAX_NEW_TOKENS[slot] for slot in slot_types],
+        tokenizer.eos_token_id,
+    )
+
+    with torch.no_grad():
+        sequences = model.model.generate(
+            **inputs,
+            max_new_tokens=max(SLOT_MAX_NEW_TOKENS.values()),
+            logits_processor=LogitsProcessorList([processor]),
+        )
+
+    # Count real tokens after the decoder start token (padding follows finished rows)
+    tokens_generated = int((sequences[:, 1:] != tokenizer.pad_token_id).sum())
+    answers = tokenizer.batch_decode(sequences, skip_special_tokens=True)
+    logger.debug("LLM slot answers: %s", answers)
 
+    record = {field: _normalize_slot(field, answer, raw_text) for field, answer in zip(SCHEMA_FIELDS, answers)}
+    return record, tokens_generated
+
+
+def _extract_free(raw_text):
+    """
+    Original free-form decoding: asks for a JSON object and parses whatever comes back.
+    """
     instruction = (
     "Extract the following information from the text: "
     "PlayerName, OpponentName, StatValue, Ranking, and Season. "
@@ -22,14 +136,54 @@ def extract_from_text_llm(raw_text):
     
     result = model(prompt, max_length=512, num_return_sequences=1)
 
-    print("DEBUG: LLM Result:", result)
+    logger.debug("LLM Result: %s", result)
 
     extracted_data = result[0]["generated_text"]
+    tokens_generated = len(model.tokenizer(extracted_data).input_ids)
 
     try:
-        return json.loads(extracted_data)
+        extracted = json.loads(extracted_data)
     except json.JSONDecodeError:
-        return {"error": "Failed to parse output", "raw_output": extracted_data}
+        extracted = None
+    # Bare answers such as "45" or "null" are valid JSON but not a record
+    if not isinstance(extracted, dict):
+        return {"error": "Failed to parse output", "raw_output": extracted_data}, tokens_generated
+    return extracted, tokens_generated
+
+
+@profile_stage
+def extract_from_text_llm(raw_text):
+    """
+    Uses an LLM to extract structured data from raw text.
+
+    With LLM_DECODING=constrained (default) the PlayerName/OpponentName/StatValue/Ranking/Season
+    schema is filled field by field: name slots can only copy tokens of the line, number slots
+    can only emit digits, and generation stops at each slot's end token. Flan-T5's vocabulary
+    has no "{" / "}" tokens, so the free-form JSON mode practically never parses.
+
+    In both modes the result is only a record when every REQUIRED_FIELDS slot is filled;
+    otherwise {"error": ...} is returned with the partial answer under "raw_output".
+    """
+    if LLM_DECODING == "constrained":
+        extracted, tokens_generated = _extract_constrained(raw_text)
+    else:
+        extracted, tokens_generated = _extract_free(raw_text)
+
+    if isinstance(extracted, dict) and "error" not in extracted:
+        decoding_stats["slotsFilled"] += sum(extracted.get(field) is not None for field in SCHEMA_FIELDS)
+        missing = [field for field in REQUIRED_FIELDS if extracted.get(field) is None]
+        if missing:
+            extracted = {"error": f"Missing {', '.join(missing)}", "raw_output": extracted}
+
+    parsed = isinstance(extracted, dict) and "error" not in extracted
+    decoding_stats["lines"] += 1
+    decoding_stats["parsed"] += parsed
+    decoding_stats["tokensGenerated"] += tokens_generated
+    increment("tokensGenerated", tokens_generated)
+    if not parsed:
+        increment("parseFailures")
+
+    return extracted
 
 
 def preprocess_raw_lines(input_file, output_file):
@@ -92,8 +246,8 @@ def process_with_llm(input_file, output_file):
             if isinstance(extracted_record, dict) and "error" not in extracted_record:
                 records.append(extracted_record)
             else:
-                print(f"Skipping invalid output for line: {line}")
-                print(f"DEBUG: Invalid Record: {extracted_record}")
+                logger.info("Skipping invalid output for line: %s", line)
+                logger.debug("Invalid Record: %s", extracted_record)
 
         extracted_tables.append({"metadata": metadata, "records": records})
 
@@ -101,14 +255,22 @@ def process_with_llm(input_file, output_file):
     with open(output_file, "w") as outfile:
         json.dump(extracted_tables, outfile, indent=4)
 
+    lines = decoding_stats["lines"]
+    if lines:
+        print(f"LLM decoding ({LLM_DECODING}): {lines} lines, {decoding_stats['tokensGenerated']} tokens generated "
+              f"({decoding_stats['tokensGenerated'] / lines:.1f} per line), "
+              f"parse success {decoding_stats['parsed'] / lines:.1%} "
+              f"(records with {' and '.join(REQUIRED_FIELDS)}), "
+              f"{decoding_stats['slotsFilled'] / (lines * len(SCHEMA_FIELDS)):.1%} of slots filled")
     print(f"Data extracted using LLM saved to {output_file}")
 
 
-# File paths
-input_file = "final_parsed_tables.json"  # Input from earlier processing
-preprocessed_file = "preprocessed_tables.json"  # Intermediate preprocessed file
-output_file = "llm_extracted_tables.json"  # Final extracted output
+if __name__ == "__main__":
+    # File paths
+    input_file = "final_parsed_tables.json"  # Input from earlier processing
+    preprocessed_file = "preprocessed_tables.json"  # Intermediate preprocessed file
+    output_file = "llm_extracted_tables.json"  # Final extracted output
 
-# Run the pipeline
-preprocess_raw_lines(input_file, preprocessed_file)  # Preprocess the raw lines
-process_with_llm(preprocessed_file, output_file)  # Process with LLM for extraction
+    # Run the pipeline
+    preprocess_raw_lines(input_file, preprocessed_file)  # Preprocess the raw lines
+    process_with_llm(preprocessed_file, output_file)  # Process with LLM for extraction
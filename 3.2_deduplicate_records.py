@@ -0,0 +1,210 @@
+#################################################################################################
+#################################################################################################
+'''
+    Deduplicates and merges parsed records across tables, pages and documents.
+
+    The same row (e.g. "Michael Smith at Kentucky") is printed in several tables of a record
+    book and again in other books. Every record is keyed by its normalized
+    (player, opponent, statistic, statPeriod, season, value) tuple and looked up in a hash index
+    of 128-bit digests in one linear pass. Duplicates are merged into the first occurrence:
+    fields it is missing are filled in and every occurrence is listed under "provenance"
+    ({"document", "table", "record"}).
+
+    Memory is bounded by `max_in_memory` merged records. Past that, the index spills to an
+    on-disk SQLite table keyed by the digest and the pass continues against both. Documents are
+    read one at a time and the output is written table by table.
+
+    Records with neither a player nor an opponent (e.g. rawLine-only fallbacks or a bare stat
+    value) are kept as they are; they are not identifiable enough to merge.
+
+    Parameters:
+        input_files (list): Parsed-table JSON files (one per document), e.g. enhanced_parsed_tables.json.
+        output_file (str): Path of the deduplicated tables JSON.
+        max_in_memory (int): Merged records held in memory before spilling (default: 500,000).
+        spill_folder (str): Folder for the spill database (default: system temp folder).
+
+    Returns:
+        dict: Counts of input records, unique records, duplicates merged and whether it spilled.
+'''
+#################################################################################################
+#################################################################################################
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+
+from profiling import profile_stage, increment
+
+def _normalize_name(value):
+    if not value:
+        return ""
+    return " ".join(re.sub(r"[^\w&]+", " ", str(value)).casefold().split())
+
+
+def _normalize_number(value):
+    if value is None:
+        return ""
+    digits = re.sub(r"\D", "", str(value))
+    return str(int(digits)) if digits else ""
+
+
+def record_key(record, metadata):
+    """
+    Returns the normalized dedup key of a record, or None when it has nothing to merge on.
+
+    The opponent falls back to teamName, since the NER parsers move opponents found in
+    team_list there.
+    """
+    player = _normalize_name(record.get("playerName"))
+    opponent = _normalize_name(record.get("opponentName") or record.get("teamName"))
+    value = _normalize_number(record.get("statValue"))
+    if not (player or opponent):
+        return None
+
+    season = re.sub(r"\s+", "", str(record.get("season") or ""))
+    return (player, opponent, _normalize_name(metadata.get("statistic")),
+            _normalize_name(metadata.get("statPeriod")), season, value)
+
+
+def _digest(key):
+    return hashlib.blake2b("\x1f".join(key).encode(), digest_size=16).digest()
+
+
+def _merge(target, record, source):
+    for field, value in record.items():
+        if field != "provenance" and target.get(field) is None and value is not None:
+            target[field] = value
+    target["provenance"].append(source)
+
+
+class _RecordIndex:
+    """
+    Digest -> merged record, in first-seen order, spilling to SQLite past `max_in_memory`.
+    """
+
+    def __init__(self, max_in_memory, spill_folder):
+        self.max_in_memory = max_in_memory
+        self.spill_folder = spill_folder
+        self.memory = {}
+        self.db = None
+        self.seq = 0
+
+    def add(self, digest, group, record, source):
+        """
+        Inserts or merges a record; returns True when it was a duplicate.
+        """
+        if digest in self.memory:
+            _merge(self.memory[digest][2], record, source)
+            return True
+
+        if self.db is not None:
+            row = self.db.execute("SELECT record FROM records WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                merged = json.loads(row[0])
+                _merge(merged, record, source)
+                self.db.execute("UPDATE records SET record = ? WHERE digest = ?", (json.dumps(merged), digest))
+                return True
+
+        self.memory[digest] = (self.seq, group, {**record, "provenance": [source]})
+        self.seq += 1
+        if len(self.memory) >= self.max_in_memory:
+            self._spill()
+        return False
+
+    def _spill(self):
+        if self.db is None:
+            handle, self.db_path = tempfile.mkstemp(suffix=".sqlite", dir=self.spill_folder)
+            os.close(handle)
+            self.db = sqlite3.connect(self.db_path)
+            self.db.execute("PRAGMA journal_mode = OFF")
+            self.db.execute("PRAGMA synchronous = OFF")
+            self.db.execute("CREATE TABLE records (digest BLOB PRIMARY KEY, seq INTEGER, grp INTEGER, record TEXT)")
+            self.db.execute("CREATE INDEX records_order ON records (grp, seq)")
+
+        self.db.executemany(
+            "INSERT INTO records VALUES (?, ?, ?, ?)",
+            ((digest, seq, group, json.dumps(record)) for digest, (seq, group, record) in self.memory.items()),
+        )
+        self.db.commit()
+        increment("spilledRecords", len(self.memory))
+        self.memory.clear()
+
+    def items(self):
+        """
+        Yields (group, record) ordered by group, then first occurrence.
+        """
+        if self.db is None:
+            for seq, group, record in sorted(self.memory.values(), key=lambda entry: (entry[1], entry[0])):
+                yield group, record
+            return
+
+        self._spill()
+        for group, record in self.db.execute("SELECT grp, record FROM records ORDER BY grp, seq"):
+            yield group, json.loads(record)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            os.remove(self.db_path)
+
+
+@profile_stage
+def deduplicate_records(input_files, output_file, max_in_memory=500_000, spill_folder=None):
+    groups = {}  # metadata JSON -> group number, in first-seen order
+    index = _RecordIndex(max_in_memory, spill_folder)
+    stats = {"inputRecords": 0, "uniqueRecords": 0, "duplicatesMerged": 0, "spilled": False}
+
+    try:
+        for document in input_files:
+            with open(document, "r") as infile:
+                tables = json.load(infile)
+
+            for table_index, table in enumerate(tables):
+                metadata = table["metadata"]
+                group = groups.setdefault(json.dumps(metadata, sort_keys=True), len(groups))
+                for record_index, record in enumerate(table["records"]):
+                    stats["inputRecords"] += 1
+                    source = {"document": document, "table": table_index, "record": record_index}
+                    key = record_key(record, metadata)
+                    # Unkeyed records get a unique digest so they pass through unmerged
+                    digest = _digest(key) if key else _digest(("\x00unkeyed", document, str(table_index), str(record_index)))
+                    if index.add(digest, group, record, source):
+                        stats["duplicatesMerged"] += 1
+
+        # Stream the merged tables out group by group
+        metadata_by_group = {group: json.loads(metadata) for metadata, group in groups.items()}
+        with open(output_file, "w") as outfile:
+            outfile.write("[")
+            current_group = None
+            for group, record in index.items():
+                if group != current_group:
+                    if current_group is not None:
+                        outfile.write("\n        ]\n    },")
+                    outfile.write(f'\n    {{\n        "metadata": {json.dumps(metadata_by_group[group])},\n        "records": [')
+                    current_group, first = group, True
+                outfile.write(("\n" if first else ",\n") + "            " + json.dumps(record))
+                first = False
+                stats["uniqueRecords"] += 1
+            if current_group is not None:
+                outfile.write("\n        ]\n    }")
+            outfile.write("\n]\n")
+
+        stats["spilled"] = index.db is not None
+    finally:
+        index.close()
+
+    increment("records", stats["inputRecords"])
+    increment("duplicates", stats["duplicatesMerged"])
+    print(f"Deduplicated {stats['inputRecords']} records into {stats['uniqueRecords']} "
+          f"({stats['duplicatesMerged']} duplicates merged) saved to {output_file}")
+    return stats
+
+
+if __name__ == "__main__":
+    input_files = ["enhanced_parsed_tables.json"]  # One parsed-tables file per document
+    output_file = "deduplicated_tables.json"
+
+    deduplicate_records(input_files, output_file)
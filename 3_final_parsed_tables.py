@@ -1,5 +1,7 @@
 import re
 import json
+from profiling import profile_stage, increment
+from parallel import PARSE_WORKERS, parse_tables_parallel
 
 def preprocess_text(text):
     """
@@ -11,6 +13,7 @@ def preprocess_text(text):
     text = text.strip()
     return text
 
+@profile_stage
 def parse_table_records_advanced(text, metadata):
     """
     Parses rows using relaxed regex and fallback logic for inconsistent formatting.
@@ -24,6 +27,7 @@ def parse_table_records_advanced(text, metadata):
     """
     records = []
     lines = text.split("\n")
+    increment("lines", len(lines))
 
     for line in lines:
         # Relaxed regex to capture player names, opponents, and values
@@ -42,15 +46,23 @@ def parse_table_records_advanced(text, metadata):
             if re.search(r"\d+", line):
                 records.append({"rawLine": line.strip()})
 
+    increment("records", len(records))
     return {"metadata": metadata, "records": records}
 
-def process_classified_tables(input_file, output_file):
+def parse_table_lines(lines, metadata):
+    """
+    Line-list entry point of parse_table_records_advanced, used for sharded parsing.
+    """
+    return parse_table_records_advanced("\n".join(lines), metadata)
+
+def process_classified_tables(input_file, output_file, workers=PARSE_WORKERS):
     """
     Processes classified tables, parses records, and saves as structured JSON.
 
     Parameters:
         input_file (str): Path to JSON file with classified tables.
         output_file (str): Path to save the final structured JSON.
+        workers (int): Worker processes for parsing (default: PARSE_WORKERS, see parallel.py).
 
     Returns:
         None
@@ -58,11 +70,9 @@ def process_classified_tables(input_file, output_file):
     with open(input_file, "r") as infile:
         classified_tables = json.load(infile)
 
+    tables = [(preprocess_text(table["text"]).split("\n"), table["metadata"]) for table in classified_tables]
     parsed_tables = []
-    for table in classified_tables:
-        metadata = table["metadata"]
-        text = preprocess_text(table["text"])
-        parsed_table = parse_table_records_advanced(text, metadata)
+    for parsed_table in parse_tables_parallel(parse_table_lines, tables, workers):
         if parsed_table["records"]:  # Only include tables with valid records
             parsed_tables.append(parsed_table)
 
@@ -72,9 +82,10 @@ def process_classified_tables(input_file, output_file):
 
     print(f"Parsed tables saved to {output_file}")
 
-# Define file paths
-classified_input = "classified_tables/classified_tables.json"  # Output from Step 2
-parsed_output = "final_parsed_tables.json"
+if __name__ == "__main__":
+    # Define file paths
+    classified_input = "classified_tables/classified_tables.json"  # Output from Step 2
+    parsed_output = "final_parsed_tables.json"
 
-# Process and parse tables
-process_classified_tables(classified_input, parsed_output)
+    # Process and parse tables
+    process_classified_tables(classified_input, parsed_output)
@@ -1,5 +1,6 @@
 import re
 import json
+from profiling import profile_stage, increment
 
 def preprocess_text(raw_lines):
     """
@@ -26,6 +27,7 @@ def preprocess_text(raw_lines):
     
     return consolidated_lines
 
+@profile_stage
 def advanced_preprocessing(lines):
     """
     Cleans OCR artifacts and consolidates multi-line records.
@@ -45,6 +47,7 @@ def advanced_preprocessing(lines):
         else:
             temp_line += " " + line
 
+    increment("lines", len(lines))
     return clean_lines
 
 
@@ -66,8 +69,9 @@ def preprocess_raw_lines(input_file, output_file):
 
     print(f"Preprocessed data saved to {output_file}")
 
-input_file = "final_parsed_tables.json"
-output_file = "preprocessed_tables.json"
+if __name__ == "__main__":
+    input_file = "final_parsed_tables.json"
+    output_file = "preprocessed_tables.json"
 
-preprocess_raw_lines(input_file, output_file)
-print(f"Preprocessed data saved to {output_file}")
+    preprocess_raw_lines(input_file, output_file)
+    print(f"Preprocessed data saved to {output_file}")
@@ -0,0 +1,405 @@
+#################################################################################################
+#################################################################################################
+'''
+    Reproducible benchmark of the pipeline stages on a synthetic record book.
+
+    A record book with known ground truth is generated (see synthetic_record_book.py), pushed
+    through the stage functions of the step scripts and measured per stage:
+        - throughput (units/sec, where a unit is a page or a line depending on the stage),
+        - latency per call (p50 / p95),
+        - CPU seconds and peak resident memory (from profiling.py),
+    plus field-level precision/recall of the parsers against the ground truth.
+
+    The timed passes call the undecorated stage functions, so throughput and latency exclude the
+    @profile_stage overhead; CPU and memory come from one extra, instrumented pass.
+
+    Every run is appended as one JSON line to the results file, keyed by its configuration, and
+    compared with the previous run of the same configuration so regressions show up.
+
+    Stages 0 and 1 (pdf2image / Tesseract) and the NER parser are opt-in (--with-ocr, --with-ner);
+    without --with-ocr the OCR output is simulated with `add_ocr_noise`.
+
+    Example:
+        python benchmark.py --pages 500 --noise 0.2 --repeat 3
+'''
+#################################################################################################
+#################################################################################################
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+import profiling
+from stages import REPO_DIR, load_stage
+from synthetic_record_book import add_ocr_noise, generate_record_book, render_pdf
+
+DEFAULT_RESULTS_FILE = "benchmark_results.jsonl"
+SCORED_FIELDS = ["playerName", "opponentName", "statValue", "ranking", "season"]
+
+
+def _normalize(field, value):
+    if value is None:
+        return None
+    if field in ("statValue", "ranking", "season"):
+        match = re.search(r"\d+", str(value).replace(",", ""))
+        return int(match.group()) if match else None
+    value = re.sub(r"\s+", " ", str(value)).strip().casefold()
+    return value or None
+
+
+def field_scores(predicted_tables, gold_tables):
+    """
+    Computes field-level precision and recall of parsed tables against ground truth.
+
+    Values are compared as a multiset of (statistic, field, value) tuples over the whole
+    document, so the score does not depend on how a parser splits or orders its records.
+    Names are compared case-insensitively; numeric fields by their first integer. A `teamName`
+    is scored as the opponent, since the NER parsers move opponents found in team_list there.
+
+    Parameters:
+        predicted_tables (list): Parsed tables ({"metadata": ..., "records": [...]}).
+        gold_tables (list): Ground-truth tables in the same format.
+
+    Returns:
+        dict: Field -> {"precision", "recall", "truePositives", "predicted", "gold"}.
+    """
+    def tuples(tables):
+        counts = {field: Counter() for field in SCORED_FIELDS}
+        for table in tables:
+            statistic = table["metadata"]["statistic"]
+            for record in table["records"]:
+                for field in SCORED_FIELDS:
+                    value = record.get(field)
+                    if field == "opponentName" and value is None:
+                        value = record.get("teamName")
+                    value = _normalize(field, value)
+                    if value is not None:
+                        counts[field][(statistic, value)] += 1
+        return counts
+
+    predicted, gold = tuples(predicted_tables), tuples(gold_tables)
+    scores = {}
+    for field in SCORED_FIELDS:
+        true_positives = sum((predicted[field] & gold[field]).values())
+        n_predicted, n_gold = sum(predicted[field].values()), sum(gold[field].values())
+        scores[field] = {
+            "precision": true_positives / n_predicted if n_predicted else 0.0,
+            "recall": true_positives / n_gold if n_gold else 0.0,
+            "truePositives": true_positives,
+            "predicted": n_predicted,
+            "gold": n_gold,
+        }
+    return scores
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class _StageTimer:
+    """
+    Collects per-call latencies and unit counts for one stage across repeats.
+
+    Unless `instrumented`, the stage is timed through its undecorated function (`__wrapped__`)
+    so the profiling wrapper does not inflate the measurement.
+    """
+
+    def __init__(self, unit, instrumented=False):
+        self.unit = unit
+        self.instrumented = instrumented
+        self.latencies = []
+        self.totals = []
+        self.units = 0
+        self._run_total = 0.0
+
+    def call(self, func, *args, units=1, **kwargs):
+        if not self.instrumented:
+            func = getattr(func, "__wrapped__", func)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.latencies.append(elapsed)
+        self._run_total += elapsed
+        self.units += units
+        return result
+
+    def end_run(self):
+        self.totals.append(self._run_total)
+        self._run_total = 0.0
+
+
+def _run_pipeline(pages, workspace, config, timers):
+    """
+    Runs one pass of the selected stages over the generated pages.
+
+    Returns:
+        dict: Parser name -> parsed tables of this pass.
+    """
+    stage1 = load_stage("1.1_text_cleaning.py")
+    stage2 = load_stage("2_classified_tables_headers.py")
+    stage3 = load_stage("3_final_parsed_tables.py")
+    stage3_v2 = load_stage("3_v2.py")
+
+    raw_folder = os.path.join(workspace, "text_outputs")
+    cleaned_folder = os.path.join(workspace, "cleaned_text_outputs")
+    classified_folder = os.path.join(workspace, "classified_tables")
+    for folder in (raw_folder, cleaned_folder, classified_folder):
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+
+    if config["withOcr"]:
+        stage0 = load_stage("0_pdf_to_images.py")
+        stage_ocr = load_stage("1_text_ocr.py")
+        pdf_path = os.path.join(workspace, "record_book.pdf")
+        # Render on every pass; reusing the page store would time a cache hit
+        store_path = timers["pdf_to_images"].call(
+            stage0.pdf_to_images, pdf_path, os.path.join(workspace, "page_stores"), config["dpi"],
+            units=len(pages), reuse=False,
+        )
+        timers["extract_text_from_images"].call(
+            stage_ocr.extract_text_from_images, store_path, raw_folder, units=len(pages)
+        )
+    else:
+        for page in pages:
+            with open(os.path.join(raw_folder, f"page_{page['page']:05d}.txt"), "w") as f:
+                f.write(add_ocr_noise(page["text"], config["noise"], seed=config["seed"] + page["page"]))
+
+    for file in sorted(os.listdir(raw_folder)):
+        with open(os.path.join(raw_folder, file), "r") as f:
+            raw_text = f.read()
+        cleaned_text = timers["clean_text"].call(stage1.clean_text, raw_text)
+        with open(os.path.join(cleaned_folder, file), "w") as f:
+            f.write(cleaned_text)
+
+    timers["classify_tables"].call(stage2.classify_tables, cleaned_folder, classified_folder, units=len(pages))
+    with open(os.path.join(classified_folder, "classified_tables.json"), "r") as f:
+        classified_tables = json.load(f)
+
+    results = {"parse_table_records_advanced": [], "enhanced_parsing": []}
+    for table in classified_tables:
+        text = stage3.preprocess_text(table["text"])
+        lines = [line for line in table["text"].split("\n") if line.strip()]
+        results["parse_table_records_advanced"].append(timers["parse_table_records_advanced"].call(
+            stage3.parse_table_records_advanced, text, table["metadata"], units=len(lines)
+        ))
+
+        processed_lines = timers["advanced_preprocessing"].call(
+            stage3_v2.advanced_preprocessing, lines, units=len(lines)
+        )
+        if config["withNer"]:
+            stage_ner = load_stage("3.1_improved_v2_parsed_tables.py")
+            results["enhanced_parsing"].append(timers["enhanced_parsing"].call(
+                stage_ner.enhanced_parsing, processed_lines, table["metadata"], config["teamList"],
+                units=len(processed_lines),
+            ))
+
+    return results
+
+
+def run_benchmark(pages=50, noise=0.1, seed=0, repeat=3, dpi=150, with_ocr=False, with_ner=False, workdir=None):
+    """
+    Generates a synthetic record book and benchmarks the pipeline stages on it.
+
+    Parameters:
+        pages (int): Number of synthetic pages.
+        noise (float): Noise level in [0, 1] (image degradation or simulated OCR noise).
+        seed (int): Random seed of the generator.
+        repeat (int): Number of timed passes.
+        dpi (int): Rendering / rasterization DPI for the OCR stages.
+        with_ocr (bool): Render a PDF and run stages 0 and 1 instead of simulating OCR.
+        with_ner (bool): Also run the NER parser (loads the BERT model).
+        workdir (str): Scratch folder (default: a temporary directory that is removed).
+
+    Returns:
+        dict: Result record with config, per-stage metrics and accuracy.
+    """
+    config = {"pages": pages, "noise": noise, "seed": seed, "repeat": repeat, "dpi": dpi,
+              "withOcr": with_ocr, "withNer": with_ner}
+
+    book = generate_record_book(pages, seed=seed)
+    gold_tables = [page["table"] for page in book if page["table"]]
+
+    workspace = workdir or tempfile.mkdtemp(prefix="benchmark_")
+    os.makedirs(workspace, exist_ok=True)
+    if with_ocr:
+        render_pdf(book, os.path.join(workspace, "record_book.pdf"), noise, dpi, seed)
+    if with_ner:
+        with open(os.path.join(REPO_DIR, "output_files", "team_list.json"), "r") as f:
+            config["teamList"] = json.load(f)
+
+    units = {"pdf_to_images": "pages", "extract_text_from_images": "pages", "clean_text": "pages",
+             "classify_tables": "pages", "parse_table_records_advanced": "lines",
+             "advanced_preprocessing": "lines", "enhanced_parsing": "lines"}
+    timers = {stage: _StageTimer(unit) for stage, unit in units.items()}
+
+    try:
+        for _ in range(repeat):
+            results = _run_pipeline(book, workspace, config, timers)
+            for timer in timers.values():
+                timer.end_run()
+
+        # CPU and memory come from a separate pass through the @profile_stage wrappers
+        profiling.enable()
+        profiling.reset()
+        _run_pipeline(book, workspace, config, {stage: _StageTimer(unit, instrumented=True)
+                                                for stage, unit in units.items()})
+        profile = profiling.get_summary()
+    finally:
+        if workdir is None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    stages = {}
+    for stage, timer in timers.items():
+        if not timer.latencies:
+            continue
+        median_total = statistics.median(timer.totals)
+        units_per_run = timer.units / repeat
+        stages[stage] = {
+            "unit": timer.unit,
+            "unitsPerRun": units_per_run,
+            "calls": len(timer.latencies),
+            "wallSeconds": median_total,
+            "throughput": units_per_run / median_total if median_total else 0.0,
+            "latencyP50Ms": _percentile(timer.latencies, 0.5) * 1000,
+            "latencyP95Ms": _percentile(timer.latencies, 0.95) * 1000,
+            "cpuSeconds": profile.get(stage, {}).get("cpuSeconds", 0.0),
+            "peakRssMb": profile.get(stage, {}).get("peakRss", 0) / 2 ** 20,
+        }
+
+    accuracy = {parser: field_scores(tables, gold_tables) for parser, tables in results.items() if tables}
+    config.pop("teamList", None)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "gitCommit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "stages": stages,
+        "accuracy": accuracy,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous_result(results_file, config):
+    """
+    Returns the most recent saved result with the same configuration, or None.
+    """
+    if not os.path.exists(results_file):
+        return None
+
+    previous = None
+    with open(results_file, "r") as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                if result["config"] == config:
+                    previous = result
+    return previous
+
+
+def compare_results(current, previous, tolerance=0.1):
+    """
+    Compares two benchmark results of the same configuration.
+
+    Parameters:
+        current (dict): Result of this run.
+        previous (dict): Earlier result to compare against.
+        tolerance (float): Relative slowdown / memory growth / accuracy drop that counts as a
+                           regression (default: 0.1).
+
+    Returns:
+        list: Human-readable regression messages (empty when none).
+    """
+    regressions = []
+    for stage, metrics in current["stages"].items():
+        before = previous["stages"].get(stage)
+        if not before:
+            continue
+        if metrics["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{stage}: throughput {before['throughput']:.1f} -> "
+                               f"{metrics['throughput']:.1f} {metrics['unit']}/s")
+        if metrics["peakRssMb"] > before["peakRssMb"] * (1 + tolerance):
+            regressions.append(f"{stage}: peak RSS {before['peakRssMb']:.0f} -> {metrics['peakRssMb']:.0f} MB")
+
+    for parser, fields in current["accuracy"].items():
+        for field, score in fields.items():
+            before = previous["accuracy"].get(parser, {}).get(field)
+            if not before:
+                continue
+            for metric in ("precision", "recall"):
+                if score[metric] < before[metric] - tolerance * max(before[metric], 0.01):
+                    regressions.append(f"{parser}.{field}: {metric} {before[metric]:.3f} -> {score[metric]:.3f}")
+
+    return regressions
+
+
+def print_report(result):
+    print(f"\nBenchmark ({result['config']['pages']} pages, noise {result['config']['noise']}, "
+          f"{result['config']['repeat']} runs, commit {result['gitCommit']})")
+    print(f"{'stage':<30}{'units/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'cpu s':>10}{'peak MB':>10}")
+    for stage, m in result["stages"].items():
+        print(f"{stage:<30}{m['throughput']:>12.1f}{m['latencyP50Ms']:>10.2f}{m['latencyP95Ms']:>10.2f}"
+              f"{m['cpuSeconds']:>10.3f}{m['peakRssMb']:>10.0f}")
+
+    for parser, fields in result["accuracy"].items():
+        print(f"\n{parser}")
+        for field, score in fields.items():
+            print(f"  {field:<15} precision {score['precision']:.3f}  recall {score['recall']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic record book.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--with-ocr", action="store_true", help="Render a PDF and run pdf2image + Tesseract")
+    parser.add_argument("--with-ner", action="store_true", help="Also benchmark the NER parser")
+    parser.add_argument("--workdir", help="Keep intermediate files in this folder")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="JSON-lines file results are appended to")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.pages, args.noise, args.seed, args.repeat, args.dpi,
+                           args.with_ocr, args.with_ner, args.workdir)
+    print_report(result)
+
+    previous = load_previous_result(args.results, result["config"])
+    regressions = compare_results(result, previous, args.tolerance) if previous else []
+    if previous:
+        print(f"\nCompared with {previous['timestamp']} (commit {previous['gitCommit']}):")
+        for message in regressions or ["no regressions"]:
+            print(f"  {message}")
+
+    with open(args.results, "a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"\nBenchmark result appended to {args.results}")
+
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#################################################################################################
+#################################################################################################
+'''
+    Accuracy-vs-cost evaluation of the competing table extractors.
+
+    Every extractor is run on the same gold-labelled tables and scored with the field-level
+    precision/recall of benchmark.py, together with its cost normalised per 1,000 input lines:
+    wall time, CPU seconds and working memory. Each extractor runs in its own spawned process,
+    so model load time and resident memory are measured in isolation.
+
+    Extractors:
+        rule    - 3_final_parsed_tables.py       (regex, parse_table_records_advanced)
+        ner     - 3.1_improved_parsed_tables.py  (BERT NER, enhanced_parsing)
+        ner_v2  - 3.1_improved_v2_parsed_tables.py (BERT NER with ranking/season extraction)
+        llm     - 3.1_improved_v3_parsed_tables.py (Flan-T5, extract_from_text_llm)
+    The NER and LLM extractors read lines prepared by 3_v2.py's advanced_preprocessing, as in
+    the regular pipeline.
+
+    Gold tables are a JSON list of {"metadata": ..., "text": ..., "records": [...]}; without
+    --gold a synthetic set is generated (see synthetic_record_book.py).
+
+    Example:
+        python evaluate_extractors.py --pages 40 --noise 0.2 --target 0.8
+'''
+#################################################################################################
+#################################################################################################
+
+import argparse
+import json
+import os
+import resource
+import time
+
+import psutil
+
+from benchmark import SCORED_FIELDS, field_scores
+from stages import REPO_DIR, load_stage, run_in_fresh_process
+from synthetic_record_book import add_ocr_noise, generate_record_book
+
+EXTRACTORS = {
+    "rule": "3_final_parsed_tables.py",
+    "ner": "3.1_improved_parsed_tables.py",
+    "ner_v2": "3.1_improved_v2_parsed_tables.py",
+    "llm": "3.1_improved_v3_parsed_tables.py",
+}
+
+
+def build_synthetic_gold(pages=40, noise=0.1, seed=0):
+    """
+    Builds gold-labelled tables from a synthetic record book, with simulated OCR noise applied
+    to the text and step 1.1's clean_text run over it.
+
+    Returns:
+        list: Gold tables ({"metadata", "text", "records"}).
+    """
+    clean_text = load_stage("1.1_text_cleaning.py").clean_text
+    gold_tables = []
+    for page in generate_record_book(pages, seed=seed):
+        if page["table"]:
+            text = clean_text(add_ocr_noise(page["text"], noise, seed=seed + page["page"]))
+            gold_tables.append({**page["table"], "text": text})
+    return gold_tables
+
+
+def _table_lines(table):
+    return [line for line in table["text"].split("\n") if line.strip()]
+
+
+def _load_extractor(name, team_list):
+    """
+    Imports the extractor's script (loading its model, if any) and returns a function
+    mapping a gold table to a parsed table.
+    """
+    module = load_stage(EXTRACTORS[name])
+    if name == "rule":
+        def extract(table):
+            return module.parse_table_records_advanced(module.preprocess_text(table["text"]), table["metadata"])
+        return extract
+
+    advanced_preprocessing = load_stage("3_v2.py").advanced_preprocessing
+
+    if name == "ner":
+        def extract(table):
+            parsed = module.enhanced_parsing(advanced_preprocessing(_table_lines(table)), table["metadata"], team_list)
+            parsed["records"] = module.post_process_records(parsed["records"])
+            return parsed
+        return extract
+
+    if name == "ner_v2":
+        def extract(table):
+            parsed = module.enhanced_parsing(advanced_preprocessing(_table_lines(table)), table["metadata"], team_list)
+            parsed["records"] = module.post_process_records(parsed["records"], team_list)
+            return parsed
+        return extract
+
+    def extract(table):
+        records = []
+        for line in advanced_preprocessing(_table_lines(table)):
+            record = module.extract_from_text_llm(line)
+            # Same filter as process_with_llm; the model answers with "PlayerName"-style keys
+            if isinstance(record, dict) and "error" not in record:
+                records.append({key[:1].lower() + key[1:]: value for key, value in record.items()})
+        return {"metadata": table["metadata"], "records": records}
+    return extract
+
+
+def _evaluate_in_process(name, gold_tables, team_list, queue):
+    process = psutil.Process()
+    try:
+        rss_start = process.memory_info().rss
+        load_start = time.perf_counter()
+        extract = _load_extractor(name, team_list)
+        load_seconds = time.perf_counter() - load_start
+        rss_loaded = process.memory_info().rss
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        predicted = [extract(table) for table in gold_tables]
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+
+        # ru_maxrss is reported in kilobytes on Linux
+        peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, rss_loaded)
+        queue.put({
+            "predicted": predicted,
+            "loadSeconds": load_seconds,
+            "wallSeconds": wall_seconds,
+            "cpuSeconds": cpu_seconds,
+            "modelRssMb": (rss_loaded - rss_start) / 2 ** 20,
+            "peakRssMb": peak_rss / 2 ** 20,
+            "workingRssMb": max(0, peak_rss - rss_loaded) / 2 ** 20,
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def evaluate_extractor(name, gold_tables, team_list):
+    """
+    Runs one extractor over the gold tables in a fresh process and scores it.
+
+    Parameters:
+        name (str): Key of EXTRACTORS.
+        gold_tables (list): Gold tables ({"metadata", "text", "records"}).
+        team_list (list): Team names passed to the NER extractors.
+
+    Returns:
+        dict: Accuracy per field, overall micro-averaged F1 and cost per 1,000 lines
+              (or {"error": ...} when the extractor could not run).
+    """
+    result = run_in_fresh_process(_evaluate_in_process, name, gold_tables, team_list)
+    if "error" in result:
+        return result
+
+    scores = field_scores(result.pop("predicted"), gold_tables)
+    for score in scores.values():
+        total = score["precision"] + score["recall"]
+        score["f1"] = 2 * score["precision"] * score["recall"] / total if total else 0.0
+
+    true_positives = sum(score["truePositives"] for score in scores.values())
+    n_predicted = sum(score["predicted"] for score in scores.values())
+    n_gold = sum(score["gold"] for score in scores.values())
+    overall_f1 = 2 * true_positives / (n_predicted + n_gold) if n_predicted + n_gold else 0.0
+
+    lines = sum(len(_table_lines(table)) for table in gold_tables)
+    per_1k = 1000 / lines if lines else 0.0
+    return {
+        "fields": scores,
+        "overallF1": overall_f1,
+        "lines": lines,
+        "loadSeconds": result["loadSeconds"],
+        "wallSecondsPer1kLines": result["wallSeconds"] * per_1k,
+        "cpuSecondsPer1kLines": result["cpuSeconds"] * per_1k,
+        "workingRssMbPer1kLines": result["workingRssMb"] * per_1k,
+        "modelRssMb": result["modelRssMb"],
+        "peakRssMb": result["peakRssMb"],
+    }
+
+
+def cheapest_meeting_target(report, target):
+    """
+    Returns the name of the extractor with the lowest CPU seconds per 1,000 lines whose overall
+    F1 reaches `target`, or None when no extractor does.
+    """
+    candidates = [(result["cpuSecondsPer1kLines"], name) for name, result in report.items()
+                  if "error" not in result and result["overallF1"] >= target]
+    return min(candidates)[1] if candidates else None
+
+
+def evaluate_extractors(gold_tables, extractors=None, team_list=None):
+    """
+    Evaluates the selected extractors on the same gold tables.
+
+    Returns:
+        dict: Extractor name -> result of `evaluate_extractor`.
+    """
+    if team_list is None:
+        with open(os.path.join(REPO_DIR, "output_files", "team_list.json"), "r") as f:
+            team_list = json.load(f)
+
+    report = {}
+    for name in extractors or EXTRACTORS:
+        print(f"Evaluating {name} ({EXTRACTORS[name]})...")
+        report[name] = evaluate_extractor(name, gold_tables, team_list)
+    return report
+
+
+def print_report(report, target):
+    print(f"\n{'extractor':<10}{'F1':>7}" + "".join(f"{field[:10]:>12}" for field in SCORED_FIELDS)
+          + f"{'wall s/1k':>11}{'cpu s/1k':>10}{'MB/1k':>8}{'load s':>8}{'peak MB':>9}")
+    for name, result in report.items():
+        if "error" in result:
+            print(f"{name:<10}  error: {result['error']}")
+            continue
+        print(f"{name:<10}{result['overallF1']:>7.3f}"
+              + "".join(f"{result['fields'][field]['f1']:>12.3f}" for field in SCORED_FIELDS)
+              + f"{result['wallSecondsPer1kLines']:>11.2f}{result['cpuSecondsPer1kLines']:>10.2f}"
+              f"{result['workingRssMbPer1kLines']:>8.1f}{result['loadSeconds']:>8.1f}{result['peakRssMb']:>9.0f}")
+
+    choice = cheapest_meeting_target(report, target)
+    print(f"\nCheapest extractor with overall F1 >= {target}: {choice or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the table extractors on accuracy and cost.")
+    parser.add_argument("--gold", help="JSON file of gold tables ({metadata, text, records}); synthetic if omitted")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS),
+                        help=f"Comma-separated subset of {', '.join(EXTRACTORS)}")
+    parser.add_argument("--target", type=float, default=0.8, help="Overall F1 an extractor must reach")
+    parser.add_argument("--output", default="evaluation_report.json")
+    args = parser.parse_args()
+
+    if args.gold:
+        with open(args.gold, "r") as f:
+            gold_tables = json.load(f)
+    else:
+        gold_tables = build_synthetic_gold(args.pages, args.noise, args.seed)
+
+    report = evaluate_extractors(gold_tables, args.extractors.split(","))
+    print_report(report, args.target)
+
+    with open(args.output, "w") as outfile:
+        json.dump({"target": args.target, "cheapest": cheapest_meeting_target(report, args.target),
+                   "extractors": report}, outfile, indent=4)
+    print(f"Evaluation report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#################################################################################################
+#################################################################################################
+'''
+    Pluggable inference backends for the token-classification (NER) model used in step 3.1.
+
+    Every backend returns a callable with the same interface and output as
+    `pipeline("ner", model=..., grouped_entities=True)`, so the parsers only swap how `ner` is
+    built. The backend is selected by configuration (environment variables, like profiling.py):
+
+        NER_BACKEND (str): One of
+            pytorch   - the transformers PyTorch pipeline (default),
+            onnx      - the same model exported to ONNX and run with ONNX Runtime,
+            onnx-int8 - the ONNX export with dynamic int8 quantization of the weights,
+            distilled - a smaller checkpoint fine-tuned on the same CoNLL-03 labels.
+        NER_MODEL (str): Checkpoint for the pytorch / onnx backends.
+        NER_DISTILLED_MODEL (str): Checkpoint for the distilled backend.
+        NER_ONNX_CACHE (str): Folder where ONNX exports are kept between runs (default: onnx_models).
+
+    The ONNX backends need `optimum[onnxruntime]`; the model is exported (and quantized) on first
+    use and reloaded from the cache afterwards.
+
+    Run as a script to check a backend against the PyTorch pipeline or to benchmark backends:
+        python ner_backends.py --check onnx-int8
+        python ner_backends.py --benchmark pytorch,onnx,onnx-int8,distilled
+'''
+#################################################################################################
+#################################################################################################
+
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+
+import psutil
+
+from profiling import get_logger
+from stages import run_in_fresh_process
+
+logger = get_logger(__name__)
+
+NER_BACKEND = os.environ.get("NER_BACKEND", "pytorch")
+NER_MODEL = os.environ.get("NER_MODEL", "dbmdz/bert-large-cased-finetuned-conll03-english")
+NER_DISTILLED_MODEL = os.environ.get("NER_DISTILLED_MODEL", "elastic/distilbert-base-cased-finetuned-conll03-english")
+NER_ONNX_CACHE = os.environ.get("NER_ONNX_CACHE", "onnx_models")
+
+BACKENDS = ["pytorch", "onnx", "onnx-int8", "distilled"]
+DEFAULT_LINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output_files", "preprocessed_tables.json")
+
+
+def _quantization_config():
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+
+    import cpuinfo
+    flags = cpuinfo.get_cpu_info().get("flags", [])
+    if "avx512_vnni" in flags:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    if "avx512f" in flags:
+        return AutoQuantizationConfig.avx512(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def _load_onnx_model(model, quantize):
+    """
+    Exports `model` to ONNX (and optionally quantizes it) into NER_ONNX_CACHE, or reloads a
+    previous export.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+    except ImportError as e:
+        raise ImportError("The onnx NER backends need optimum[onnxruntime]: pip install optimum[onnxruntime]") from e
+
+    export_dir = os.path.join(NER_ONNX_CACHE, model.replace("/", "__"))
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        logger.info("Exporting %s to ONNX in %s", model, export_dir)
+        ORTModelForTokenClassification.from_pretrained(model, export=True).save_pretrained(export_dir)
+
+    if not quantize:
+        return ORTModelForTokenClassification.from_pretrained(export_dir)
+
+    if not os.path.exists(os.path.join(export_dir, "model_quantized.onnx")):
+        logger.info("Quantizing %s to int8", export_dir)
+        quantizer = ORTQuantizer.from_pretrained(export_dir, file_name="model.onnx")
+        quantizer.quantize(save_dir=export_dir, quantization_config=_quantization_config())
+
+    return ORTModelForTokenClassification.from_pretrained(export_dir, file_name="model_quantized.onnx")
+
+
+def load_ner(backend=None, model=None):
+    """
+    Builds the NER callable for the configured backend.
+
+    Parameters:
+        backend (str): One of BACKENDS (default: NER_BACKEND).
+        model (str): Checkpoint to load (default: NER_MODEL, or NER_DISTILLED_MODEL for "distilled").
+
+    Returns:
+        callable: text -> list of grouped entities ({"entity_group", "word", "score", "start", "end"}).
+    """
+    from transformers import AutoTokenizer, pipeline
+
+    backend = backend or NER_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown NER backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    if backend == "distilled":
+        model = model or NER_DISTILLED_MODEL
+        return pipeline("ner", model=model, grouped_entities=True)
+
+    model = model or NER_MODEL
+    if backend == "pytorch":
+        return pipeline("ner", model=model, grouped_entities=True)
+
+    ort_model = _load_onnx_model(model, quantize=backend == "onnx-int8")
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    return pipeline("ner", model=ort_model, tokenizer=tokenizer, grouped_entities=True)
+
+
+def load_lines(lines_file=DEFAULT_LINES_FILE, limit=None):
+    """
+    Reads the processed lines of a preprocessed_tables.json file (output of 3_v2.py).
+
+    Returns:
+        list: Lines, at most `limit` of them.
+    """
+    with open(lines_file, "r") as f:
+        tables = json.load(f)
+    lines = [line for table in tables for line in table["processedLines"] if line.strip()]
+    return lines[:limit] if limit else lines
+
+
+def _entity_set(entities):
+    return {(entity["entity_group"], entity["word"]) for entity in entities}
+
+
+def compare_backends(lines, candidate, reference="pytorch"):
+    """
+    Runs two backends on the same lines and compares their grouped entities.
+
+    A line agrees when both backends return the same set of (entity_group, word) pairs.
+
+    Parameters:
+        lines (list): Input lines.
+        candidate (str): Backend under test.
+        reference (str): Backend to compare against (default: pytorch).
+
+    Returns:
+        dict: Agreement rate, max score difference on agreeing entities and the mismatching lines.
+    """
+    reference_ner = load_ner(reference)
+    candidate_ner = load_ner(candidate)
+
+    agreeing, max_score_diff, mismatches = 0, 0.0, []
+    for line in lines:
+        expected, actual = reference_ner(line), candidate_ner(line)
+        if _entity_set(expected) == _entity_set(actual):
+            agreeing += 1
+            scores = {(e["entity_group"], e["word"]): e["score"] for e in expected}
+            for entity in actual:
+                diff = abs(float(entity["score"]) - float(scores[(entity["entity_group"], entity["word"])]))
+                max_score_diff = max(max_score_diff, diff)
+        else:
+            mismatches.append({"line": line, "expected": sorted(_entity_set(expected)),
+                               "actual": sorted(_entity_set(actual))})
+
+    return {
+        "reference": reference,
+        "candidate": candidate,
+        "lines": len(lines),
+        "agreement": agreeing / len(lines) if lines else 1.0,
+        "maxScoreDiff": max_score_diff,
+        "mismatches": mismatches,
+    }
+
+
+def _benchmark_in_process(backend, lines, queue):
+    process = psutil.Process()
+    try:
+        load_start = time.perf_counter()
+        ner = load_ner(backend)
+        load_seconds = time.perf_counter() - load_start
+        rss_loaded = process.memory_info().rss
+
+        ner(lines[0])  # warm-up
+        start = time.perf_counter()
+        for line in lines:
+            ner(line)
+        elapsed = time.perf_counter() - start
+
+        # ru_maxrss is reported in kilobytes on Linux
+        peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, rss_loaded)
+        queue.put({"loadSeconds": load_seconds, "linesPerSecond": len(lines) / elapsed if elapsed else 0.0,
+                   "rssMb": rss_loaded / 2 ** 20, "peakRssMb": peak_rss / 2 ** 20})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def benchmark_backend(backend, lines):
+    """
+    Measures lines/sec and resident memory of one backend in a fresh process.
+
+    Returns:
+        dict: loadSeconds, linesPerSecond, rssMb (after load) and peakRssMb, or {"error": ...}.
+    """
+    return run_in_fresh_process(_benchmark_in_process, backend, lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the NER inference backends.")
+    parser.add_argument("--check", metavar="BACKEND", help="Compare BACKEND's entities with the PyTorch pipeline")
+    parser.add_argument("--benchmark", metavar="BACKENDS", help=f"Comma-separated subset of {', '.join(BACKENDS)}")
+    parser.add_argument("--lines-file", default=DEFAULT_LINES_FILE)
+    parser.add_argument("--limit", type=int, default=200, help="Number of lines to use")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    lines = load_lines(args.lines_file, args.limit)
+
+    if args.check:
+        result = compare_backends(lines, args.check)
+        print(f"{args.check} vs pytorch: {result['agreement']:.1%} of {result['lines']} lines agree, "
+              f"max score difference {result['maxScoreDiff']:.4f}")
+        for mismatch in result["mismatches"][:10]:
+            print(f"  {mismatch['line']}\n    pytorch: {mismatch['expected']}\n    {args.check}: {mismatch['actual']}")
+        if result["agreement"] < args.min_agreement:
+            raise SystemExit(f"Agreement below {args.min_agreement:.0%}")
+
+    if args.benchmark:
+        print(f"\n{'backend':<12}{'lines/s':>10}{'load s':>9}{'RSS MB':>9}{'peak MB':>9}")
+        for backend in args.benchmark.split(","):
+            result = benchmark_backend(backend, lines)
+            if "error" in result:
+                print(f"{backend:<12}  error: {result['error']}")
+                continue
+            print(f"{backend:<12}{result['linesPerSecond']:>10.1f}{result['loadSeconds']:>9.1f}"
+                  f"{result['rssMb']:>9.0f}{result['peakRssMb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
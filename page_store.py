@@ -0,0 +1,252 @@
+#################################################################################################
+#################################################################################################
+'''
+    Single-file, memory-mapped store of rasterized pages (replaces per-page PNG folders).
+
+    One file per document holds the raw 8-bit grayscale pixel planes of its pages, each aligned
+    to 4 KiB, followed by a JSON index of page number, offset and shape. Readers `mmap` the file
+    and get zero-copy NumPy views of a page or a region of it, so loading a page needs no PNG
+    decoding and the OS page cache is shared between processes reading the same document.
+
+    Tesseract itself only reads image files: pytesseract writes every image it is given to a
+    temporary file (a PNG by default). `tesseract_image` marks pages as BMP, so that file is an
+    uncompressed copy of the pixels rather than a zlib-compressed PNG encoded and decoded per page.
+
+    Pages can optionally be stored as square tiles (each tile contiguous in the file), so
+    reading a region of a large page only touches the tiles it overlaps.
+
+    Stores are named after a fingerprint of the PDF contents and the rendering settings, so a
+    rerun on an unchanged PDF finds and reuses the existing store instead of rendering again.
+
+    File layout:
+        b"PGSTORE1" | index offset (uint64, little-endian) | pixel planes ... | JSON index
+'''
+#################################################################################################
+#################################################################################################
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+from PIL import Image
+
+MAGIC = b"PGSTORE1"
+HEADER = struct.Struct("<8sQ")
+ALIGNMENT = 4096
+VERSION = 1
+
+
+def pdf_fingerprint(pdf_path, dpi, tile_size=None, pages=None):
+    """
+    Hashes the PDF bytes together with the rendering settings.
+
+    Parameters:
+        pdf_path (str): Path to the PDF file.
+        dpi (int): Rendering DPI.
+        tile_size (int): Tile edge in pixels, or None for untiled pages.
+        pages (list): Subset of page numbers stored, or None for all pages.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps({"dpi": dpi, "tileSize": tile_size, "pages": pages}).encode())
+    return digest.hexdigest()
+
+
+def store_path_for(pdf_path, store_folder, dpi, tile_size=None, pages=None):
+    """
+    Returns the path of the page store for a PDF and rendering settings (it may not exist yet).
+    """
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    fingerprint = pdf_fingerprint(pdf_path, dpi, tile_size, pages)
+    return os.path.join(store_folder, f"{name}_{fingerprint[:16]}.pages")
+
+
+def is_valid_store(path):
+    """
+    Returns True when `path` is a complete page store.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic, index_offset = HEADER.unpack(f.read(HEADER.size))
+            return magic == MAGIC and 0 < index_offset < os.fstat(f.fileno()).st_size
+    except (OSError, struct.error):
+        return False
+
+
+def tesseract_image(pixels):
+    """
+    Wraps page pixels for pytesseract so its temporary input file is written as an
+    uncompressed BMP instead of a PNG.
+
+    Parameters:
+        pixels (ndarray): 2-D uint8 page (or region) pixels.
+
+    Returns:
+        PIL.Image.Image: Grayscale image with format "BMP".
+    """
+    image = Image.fromarray(pixels)
+    image.format = "BMP"
+    return image
+
+
+class PageStoreWriter:
+    """
+    Appends rendered pages to a new store. The file is written under a temporary name and
+    moved into place on close, so readers never see a partial store.
+    """
+
+    def __init__(self, path, tile_size=None, metadata=None):
+        self.path = path
+        self.tile_size = tile_size
+        self.metadata = metadata or {}
+        self.pages = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = f"{path}.tmp{os.getpid()}"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, 0))
+
+    def _align(self):
+        padding = -self._file.tell() % ALIGNMENT
+        if padding:
+            self._file.write(b"\0" * padding)
+
+    def add_page(self, image, page_number):
+        """
+        Stores a page image (PIL image or 2-D uint8 array) as a grayscale plane.
+        """
+        if not isinstance(image, np.ndarray):
+            image = np.asarray(image.convert("L"))
+        pixels = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = pixels.shape
+
+        if self.tile_size:
+            tile = self.tile_size
+            tiles_y, tiles_x = -(-height // tile), -(-width // tile)
+            padded = np.full((tiles_y * tile, tiles_x * tile), 255, dtype=np.uint8)
+            padded[:height, :width] = pixels
+            # (tiles_y, tiles_x, tile, tile): every tile is contiguous in the file
+            pixels = np.ascontiguousarray(padded.reshape(tiles_y, tile, tiles_x, tile).transpose(0, 2, 1, 3))
+
+        self._align()
+        self.pages.append({"page": page_number, "offset": self._file.tell(), "height": height, "width": width})
+        self._file.write(pixels.tobytes())
+
+    def close(self):
+        index = json.dumps({"version": VERSION, "tileSize": self.tile_size, "metadata": self.metadata,
+                            "pages": self.pages}).encode()
+        self._align()
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, index_offset))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PageStore:
+    """
+    Read-only, memory-mapped view of a page store.
+
+    Arrays returned by `page` (untiled stores), `region` (untiled stores) and `tiles` are
+    zero-copy views of the mapping; release them before calling `close`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, index_offset = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or not index_offset:
+                raise ValueError(f"{path} is not a complete page store")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index = json.loads(self._mmap[index_offset:])
+        self.tile_size = index["tileSize"]
+        self.metadata = index["metadata"]
+        self.pages = index["pages"]
+        self.page_numbers = [entry["page"] for entry in self.pages]
+        self._by_number = {entry["page"]: entry for entry in self.pages}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def _plane(self, entry):
+        height, width, tile = entry["height"], entry["width"], self.tile_size
+        if not tile:
+            return np.frombuffer(self._mmap, dtype=np.uint8, count=height * width,
+                                 offset=entry["offset"]).reshape(height, width)
+        tiles_y, tiles_x = -(-height // tile), -(-width // tile)
+        return np.frombuffer(self._mmap, dtype=np.uint8, count=tiles_y * tiles_x * tile * tile,
+                             offset=entry["offset"]).reshape(tiles_y, tiles_x, tile, tile)
+
+    def tiles(self, page_number):
+        """
+        Returns the (tiles_y, tiles_x, tile, tile) zero-copy view of a tiled page.
+        """
+        if not self.tile_size:
+            raise ValueError("Store is not tiled")
+        return self._plane(self._by_number[page_number])
+
+    def region(self, page_number, top, left, height, width):
+        """
+        Returns pixels [top:top+height, left:left+width] of a page: a zero-copy view for
+        untiled stores, assembled from the overlapping tiles otherwise.
+        """
+        entry = self._by_number[page_number]
+        bottom, right = min(top + height, entry["height"]), min(left + width, entry["width"])
+        plane = self._plane(entry)
+        if not self.tile_size:
+            return plane[top:bottom, left:right]
+
+        tile = self.tile_size
+        ty0, ty1 = top // tile, -(-bottom // tile)
+        tx0, tx1 = left // tile, -(-right // tile)
+        block = plane[ty0:ty1, tx0:tx1].transpose(0, 2, 1, 3).reshape((ty1 - ty0) * tile, (tx1 - tx0) * tile)
+        return block[top - ty0 * tile:bottom - ty0 * tile, left - tx0 * tile:right - tx0 * tile]
+
+    def page(self, page_number):
+        """
+        Returns a page as a 2-D uint8 array (zero-copy for untiled stores).
+        """
+        entry = self._by_number[page_number]
+        return self.region(page_number, 0, 0, entry["height"], entry["width"])
+
+    def iter_pages(self):
+        """
+        Yields (page_number, pixels) in stored order.
+        """
+        for page_number in self.page_numbers:
+            yield page_number, self.page(page_number)
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views of the mapping are still alive; it is released when they are collected
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
@@ -0,0 +1,153 @@
+#################################################################################################
+#################################################################################################
+'''
+    Process-parallel table parsing for step 3.
+
+    Tables are split into chunks of lines and parsed by a pool of forked worker processes. The
+    step scripts load their NER model at import, i.e. in the parent before the pool is forked,
+    so every worker shares the model weights copy-on-write instead of loading its own copy.
+    `gc.freeze()` keeps the collector from touching (and so copying) those shared pages. Chunks
+    are collected in submission order, so the output is identical to a serial run; this holds
+    because the parsers handle each line independently.
+
+    Stage timings, counters, RSS samples and PIPELINE_PROFILE_STAGE cProfile stats recorded by
+    the workers (see profiling.py) are sent back with each chunk and merged into the parent's
+    trace, summary and .prof dump; each worker gets its own "rss" track under its pid.
+
+    Configuration:
+        PARSE_WORKERS (int): Default number of worker processes for the step scripts
+                             (default: 1, i.e. serial).
+
+    Run as a script to measure speedup against worker count:
+        python parallel.py --extractor ner_v2 --workers 1,2,4,8
+'''
+#################################################################################################
+#################################################################################################
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from functools import partial
+
+import profiling
+from stages import REPO_DIR, load_stage
+
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "1"))
+CHUNK_LINES = 32
+
+
+def _init_worker():
+    profiling.reset_after_fork()
+    # The processes are the parallelism; one intra-op thread each avoids oversubscription
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(1)
+
+
+def _parse_chunk(parse, task):
+    table_index, lines, metadata = task
+    records = parse(lines, metadata)["records"]
+    return table_index, records, profiling.collect()
+
+
+def parse_tables_parallel(parse, tables, workers=PARSE_WORKERS, chunk_lines=CHUNK_LINES):
+    """
+    Parses tables with `parse`, sharding their lines across forked worker processes.
+
+    Parameters:
+        parse (callable): (lines, metadata) -> {"metadata", "records"}. Must be a module-level
+                          function (or a functools.partial of one) so it can be sent to workers.
+        tables (list): (lines, metadata) pairs.
+        workers (int): Worker processes; 1 parses each table serially in this process.
+        chunk_lines (int): Lines per task (default: 32).
+
+    Returns:
+        list: Parsed tables ({"metadata", "records"}) in input order.
+    """
+    if workers <= 1:
+        return [parse(lines, metadata) for lines, metadata in tables]
+
+    tasks = [
+        (table_index, lines[start:start + chunk_lines], metadata)
+        for table_index, (lines, metadata) in enumerate(tables)
+        for start in range(0, max(len(lines), 1), chunk_lines)
+    ]
+    records = [[] for _ in tables]
+
+    profiling.stop_sampler()
+    gc.freeze()
+    try:
+        with multiprocessing.get_context("fork").Pool(workers, initializer=_init_worker) as pool:
+            # The workers are forked by now; keep sampling the parent's RSS while they run
+            profiling.start_sampler()
+            for table_index, chunk_records, profile in pool.imap(partial(_parse_chunk, parse), tasks):
+                records[table_index].extend(chunk_records)
+                profiling.merge(profile)
+    finally:
+        gc.unfreeze()
+        profiling.start_sampler()
+
+    return [{"metadata": metadata, "records": table_records}
+            for (lines, metadata), table_records in zip(tables, records)]
+
+
+def _load_benchmark_parser(extractor, team_list):
+    if extractor == "rule":
+        return load_stage("3_final_parsed_tables.py").parse_table_lines
+    script = {"ner": "3.1_improved_parsed_tables.py", "ner_v2": "3.1_improved_v2_parsed_tables.py"}[extractor]
+    return partial(load_stage(script).enhanced_parsing, team_list=team_list)
+
+
+def measure_speedup(extractor, tables, worker_counts, team_list):
+    """
+    Times `parse_tables_parallel` for each worker count and checks the output against serial.
+
+    Returns:
+        list: {"workers", "seconds", "speedup", "efficiency", "identical"} per worker count.
+    """
+    parse = _load_benchmark_parser(extractor, team_list)
+    baseline, baseline_seconds, results = None, None, []
+    for workers in sorted(worker_counts):
+        start = time.perf_counter()
+        parsed = parse_tables_parallel(parse, tables, workers)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline, baseline_seconds = parsed, seconds
+        speedup = baseline_seconds / seconds if seconds else 0.0
+        results.append({"workers": workers, "seconds": seconds, "speedup": speedup,
+                        "efficiency": speedup / workers, "identical": parsed == baseline})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parsing speedup against worker count.")
+    parser.add_argument("--extractor", choices=["rule", "ner", "ner_v2"], default="ner_v2")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--input", default=os.path.join(REPO_DIR, "output_files", "preprocessed_tables.json"),
+                        help="preprocessed_tables.json (output of 3_v2.py)")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat the input tables this many times")
+    args = parser.parse_args()
+
+    with open(args.input, "r") as f:
+        tables = [(table["processedLines"], table["metadata"]) for table in json.load(f)] * args.scale
+    with open(os.path.join(REPO_DIR, "output_files", "team_list.json"), "r") as f:
+        team_list = json.load(f)
+
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+    if 1 not in worker_counts:
+        worker_counts.append(1)
+
+    lines = sum(len(table_lines) for table_lines, metadata in tables)
+    print(f"{args.extractor}: {len(tables)} tables, {lines} lines, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'seconds':>10}{'lines/s':>10}{'speedup':>9}{'efficiency':>12}{'identical':>11}")
+    for result in measure_speedup(args.extractor, tables, worker_counts, team_list):
+        print(f"{result['workers']:>8}{result['seconds']:>10.2f}{lines / result['seconds']:>10.1f}"
+              f"{result['speedup']:>9.2f}{result['efficiency']:>12.0%}{str(result['identical']):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#################################################################################################
+#################################################################################################
+'''
+    Lightweight stage-level instrumentation shared by every step of the pipeline.
+
+    Each stage function is wrapped with `@profile_stage`, which records wall time, CPU time,
+    call counts, custom counters and resident memory (RSS) for every call. When tracing is
+    enabled the run is written out as a Chrome trace (open it in chrome://tracing or
+    https://ui.perfetto.dev) with a per-stage summary under "otherData".
+
+    Configuration (environment variables, so the step scripts keep their usual invocation):
+        PIPELINE_TRACE (str): Path of the JSON trace to write. Tracing is off when unset.
+        PIPELINE_PROFILE_STAGE (str): Name of a stage to run under cProfile.
+        PIPELINE_PROFILE_OUTPUT (str): Where to dump the cProfile stats
+                                       (default: "<stage>.prof").
+        PIPELINE_MEMORY_INTERVAL (float): RSS sampling interval in seconds (default: 0.05).
+        PIPELINE_MEMORY_SAMPLES (int): Most RSS samples kept for the trace; past that they are
+                                       downsampled, keeping the peak of each pair (default: 10000).
+        PIPELINE_LOG_LEVEL (str): Logging level for the pipeline loggers (default: INFO).
+'''
+#################################################################################################
+#################################################################################################
+
+import atexit
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+import psutil
+
+TRACE_FILE = os.environ.get("PIPELINE_TRACE")
+PROFILE_STAGE = os.environ.get("PIPELINE_PROFILE_STAGE")
+PROFILE_OUTPUT = os.environ.get("PIPELINE_PROFILE_OUTPUT") or f"{PROFILE_STAGE}.prof"
+MEMORY_INTERVAL = float(os.environ.get("PIPELINE_MEMORY_INTERVAL", "0.05"))
+MEMORY_SAMPLES = int(os.environ.get("PIPELINE_MEMORY_SAMPLES", "10000"))
+LOG_LEVEL = os.environ.get("PIPELINE_LOG_LEVEL", "INFO").upper()
+
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+_process = psutil.Process()
+_lock = threading.Lock()
+_local = threading.local()
+_events = []
+_memory_samples = []
+_sample_stride = 1
+_open_frames = {}  # id -> stage call in progress on any thread; the sampler raises its running peak
+_worker_memory_samples = {}  # pid -> RSS samples merged from worker processes
+_summary = {}
+_profiler = None
+_worker_profile = None  # pstats.Stats merged from worker processes
+_sampler = None
+_start = time.perf_counter()
+_enabled = bool(TRACE_FILE or PROFILE_STAGE)
+
+
+def get_logger(name):
+    """
+    Returns a logger for a pipeline step. Debug messages are filtered by PIPELINE_LOG_LEVEL,
+    so pass arguments lazily (logger.debug("msg %s", value)) to keep them free when disabled.
+    """
+    return logging.getLogger(name)
+
+
+def tracing_enabled():
+    """
+    Returns True when a trace or a cProfile dump has been requested for this run,
+    or when instrumentation was switched on with `enable()`.
+    """
+    return _enabled
+
+
+def enable():
+    """
+    Turns instrumentation on for the rest of the process (used by the benchmark suite,
+    which reads `get_summary()` instead of writing a trace).
+    """
+    global _enabled
+    _enabled = True
+
+
+def _now_us():
+    return (time.perf_counter() - _start) * 1e6
+
+
+def _sample_memory(stop_event):
+    """
+    Background thread that samples process RSS until `stop_event` is set.
+
+    Each sample raises the running peak of every open stage frame, so closing a frame is
+    O(1) however long the run. The trace buffer is bounded by MEMORY_SAMPLES: when full,
+    adjacent samples are merged (keeping the higher one) and only every other tick is kept.
+    """
+    global _sample_stride
+    tick = 0
+    while not stop_event.wait(MEMORY_INTERVAL):
+        rss = _process.memory_info().rss
+        with _lock:
+            for frame in _open_frames.values():
+                if rss > frame["peak"]:
+                    frame["peak"] = rss
+            tick += 1
+            if tick % _sample_stride:
+                continue
+            _memory_samples.append((_now_us(), rss))
+            if len(_memory_samples) >= MEMORY_SAMPLES:
+                _downsample(_memory_samples)
+                _sample_stride *= 2
+
+
+def _downsample(samples):
+    # Halves a sample buffer in place, keeping the higher RSS of each adjacent pair
+    samples[:] = [max(pair, key=lambda sample: sample[1]) for pair in zip(samples[::2], samples[1::2])]
+
+
+def _ensure_sampler():
+    global _sampler
+    if _sampler is None:
+        stop_event = threading.Event()
+        thread = threading.Thread(target=_sample_memory, args=(stop_event,), daemon=True)
+        thread.start()
+        _sampler = (thread, stop_event)
+
+
+def increment(counter, amount=1):
+    """
+    Adds `amount` to a named counter of the stage currently running on this thread.
+
+    Parameters:
+        counter (str): Counter name (e.g. "pages", "records").
+        amount (int): Value to add (default: 1).
+
+    Returns:
+        None
+    """
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        return
+    counters = stack[-1]["counters"]
+    counters[counter] = counters.get(counter, 0) + amount
+
+
+def _record(name, start_us, end_us, cpu_s, rss_before, rss_after, frame):
+    counters = frame["counters"]
+    with _lock:
+        del _open_frames[id(frame)]
+        peak = max(frame["peak"], rss_after)
+        _events.append({
+            "name": name,
+            "cat": "stage",
+            "ph": "X",
+            "ts": start_us,
+            "dur": end_us - start_us,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {
+                "cpuSeconds": cpu_s,
+                "rssBefore": rss_before,
+                "rssAfter": rss_after,
+                "rssPeak": peak,
+                **counters,
+            },
+        })
+
+        stage = _summary.setdefault(name, {"calls": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0,
+                                           "maxWallSeconds": 0.0, "peakRss": 0, "counters": {}})
+        wall_s = (end_us - start_us) / 1e6
+        stage["calls"] += 1
+        stage["wallSeconds"] += wall_s
+        stage["cpuSeconds"] += cpu_s
+        stage["maxWallSeconds"] = max(stage["maxWallSeconds"], wall_s)
+        stage["peakRss"] = max(stage["peakRss"], peak)
+        for key, value in counters.items():
+            stage["counters"][key] = stage["counters"].get(key, 0) + value
+
+
+def profile_stage(func):
+    """
+    Decorator that times a stage function and records its counters and memory.
+
+    The stage is named after the wrapped function. While instrumentation is off (no
+    PIPELINE_TRACE / PIPELINE_PROFILE_STAGE and no `enable()` call) the wrapper calls
+    straight through.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not tracing_enabled():
+            return func(*args, **kwargs)
+
+        global _profiler
+        _ensure_sampler()
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        rss_before = _process.memory_info().rss
+        frame = {"counters": {}, "peak": rss_before}
+        stack.append(frame)
+        with _lock:
+            _open_frames[id(frame)] = frame
+
+        # Only the outermost call of the chosen stage drives the profiler, so recursive
+        # or nested calls do not try to re-enable it.
+        profiler = None
+        if name == PROFILE_STAGE and not getattr(_local, "profiling", False):
+            if _profiler is None:
+                _profiler = cProfile.Profile()
+            profiler = _profiler
+            _local.profiling = True
+
+        cpu_start = time.process_time()
+        start_us = _now_us()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            return func(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _local.profiling = False
+            end_us = _now_us()
+            cpu_s = time.process_time() - cpu_start
+            stack.pop()
+            _record(name, start_us, end_us, cpu_s, rss_before, _process.memory_info().rss, frame)
+
+    return wrapper
+
+
+def start_sampler():
+    """
+    Starts the RSS sampler thread if instrumentation is on (e.g. again after `stop_sampler`).
+    """
+    if tracing_enabled():
+        _ensure_sampler()
+
+
+def stop_sampler():
+    """
+    Stops the RSS sampler thread; the next stage call or `start_sampler` starts a new one.
+    Called before forking, so no child can inherit the lock while the sampler holds it.
+    """
+    global _sampler
+    if _sampler is not None:
+        thread, stop_event = _sampler
+        stop_event.set()
+        thread.join()
+        _sampler = None
+
+
+def reset_after_fork():
+    """
+    Gives a forked child its own instrumentation state: a fresh lock, thread-local stack and
+    process handle, no sampler or profiler, and nothing collected yet.
+    """
+    global _process, _lock, _local, _sampler, _profiler, _worker_profile, _sample_stride
+    _process = psutil.Process()
+    _lock = threading.Lock()
+    _local = threading.local()
+    _sampler = None
+    _profiler = None
+    _worker_profile = None
+    _sample_stride = 1
+    _events.clear()
+    _memory_samples.clear()
+    _worker_memory_samples.clear()
+    _open_frames.clear()
+    _summary.clear()
+
+
+class _CollectedProfile:
+    # Raw cProfile stats from another process, in the shape pstats.Stats loads
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def collect():
+    """
+    Returns and clears what this process collected so far: events, stage summaries, RSS
+    samples and the cProfile stats of PIPELINE_PROFILE_STAGE (used by worker processes to hand
+    their measurements to the parent, see `merge`). Must be called outside any stage.
+
+    Returns:
+        dict: {"pid", "events": [...], "stages": {...}, "memorySamples": [...], "profile": dict or None}
+    """
+    global _profiler
+    profile = None
+    if _profiler is not None:
+        _profiler.create_stats()
+        profile = _profiler.stats
+        _profiler = None
+
+    with _lock:
+        collected = {"pid": os.getpid(), "events": list(_events), "stages": json.loads(json.dumps(_summary)),
+                     "memorySamples": list(_memory_samples), "profile": profile}
+        _events.clear()
+        _summary.clear()
+        _memory_samples.clear()
+    return collected
+
+
+def merge(collected):
+    """
+    Adds the measurements collected in another process (output of `collect`). Its RSS samples
+    become a separate "rss" counter track under its pid and its cProfile stats are added to the
+    PIPELINE_PROFILE_STAGE dump.
+    """
+    global _worker_profile
+    if collected["profile"]:
+        profile = _CollectedProfile(collected["profile"])
+        if _worker_profile is None:
+            _worker_profile = pstats.Stats(profile)
+        else:
+            _worker_profile.add(profile)
+
+    with _lock:
+        _events.extend(collected["events"])
+        samples = _worker_memory_samples.setdefault(collected["pid"], [])
+        samples.extend(collected["memorySamples"])
+        if len(samples) >= MEMORY_SAMPLES:
+            _downsample(samples)
+        for name, other in collected["stages"].items():
+            stage = _summary.setdefault(name, {"calls": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0,
+                                               "maxWallSeconds": 0.0, "peakRss": 0, "counters": {}})
+            stage["calls"] += other["calls"]
+            stage["wallSeconds"] += other["wallSeconds"]
+            stage["cpuSeconds"] += other["cpuSeconds"]
+            stage["maxWallSeconds"] = max(stage["maxWallSeconds"], other["maxWallSeconds"])
+            stage["peakRss"] = max(stage["peakRss"], other["peakRss"])
+            for key, value in other["counters"].items():
+                stage["counters"][key] = stage["counters"].get(key, 0) + value
+
+
+def get_summary():
+    """
+    Returns a copy of the per-stage summary collected so far.
+
+    Returns:
+        dict: Stage name -> calls, wall/CPU seconds, peak RSS and summed counters.
+    """
+    with _lock:
+        return json.loads(json.dumps(_summary))
+
+
+def reset():
+    """
+    Clears all collected events, samples and summaries (used between benchmark runs).
+    """
+    global _sample_stride
+    with _lock:
+        _events.clear()
+        _memory_samples.clear()
+        _worker_memory_samples.clear()
+        _sample_stride = 1
+        _summary.clear()
+
+
+def write_trace(trace_file=None):
+    """
+    Writes the collected events as a Chrome trace JSON file.
+
+    Parameters:
+        trace_file (str): Output path (default: PIPELINE_TRACE).
+
+    Returns:
+        None
+    """
+    trace_file = trace_file or TRACE_FILE
+    if not trace_file:
+        return
+
+    with _lock:
+        memory_samples = [(os.getpid(), _memory_samples)] + list(_worker_memory_samples.items())
+        memory_events = [
+            {"name": "rss", "ph": "C", "ts": ts, "pid": pid, "args": {"bytes": rss}}
+            for pid, samples in memory_samples for ts, rss in samples
+        ]
+        trace = {
+            "traceEvents": list(_events) + memory_events,
+            "displayTimeUnit": "ms",
+            "otherData": {"stages": dict(_summary)},
+        }
+
+    with open(trace_file, "w") as outfile:
+        json.dump(trace, outfile, indent=4)
+
+    logging.getLogger(__name__).info("Stage trace saved to %s", trace_file)
+
+
+def _finish():
+    if _sampler is not None:
+        _sampler[1].set()
+    if _profiler is not None or _worker_profile is not None:
+        stats = _worker_profile
+        if _profiler is not None:
+            stats = pstats.Stats(_profiler)
+            if _worker_profile is not None:
+                stats.add(_worker_profile)
+        stats.dump_stats(PROFILE_OUTPUT)
+        logging.getLogger(__name__).info("cProfile stats for %s saved to %s", PROFILE_STAGE, PROFILE_OUTPUT)
+    write_trace()
+
+
+atexit.register(_finish)
@@ -0,0 +1,72 @@
+#################################################################################################
+#################################################################################################
+'''
+    Loads the numbered step scripts (e.g. "3_final_parsed_tables.py") as modules so their
+    stage functions can be reused by the benchmark and evaluation tools. The file names start
+    with a digit, so they cannot be imported with a plain `import` statement.
+'''
+#################################################################################################
+#################################################################################################
+
+import importlib.util
+import multiprocessing
+import os
+import re
+import sys
+from queue import Empty
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_loaded = {}
+
+
+def load_stage(script):
+    """
+    Imports a step script by file name and returns the module (cached per process).
+
+    Parameters:
+        script (str): File name of the step script, relative to the repository root.
+
+    Returns:
+        module: The imported script. Its `if __name__ == "__main__"` block is not run.
+    """
+    if script in _loaded:
+        return _loaded[script]
+
+    path = os.path.join(REPO_DIR, script)
+    module_name = "stage_" + re.sub(r"\W", "_", os.path.splitext(script)[0])
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    _loaded[script] = module
+    return module
+
+
+def run_in_fresh_process(target, *args):
+    """
+    Runs `target(*args, queue)` in a spawned process and returns the one result it puts on the
+    queue. Used to measure model load time and memory without interference between runs.
+
+    Parameters:
+        target (callable): Module-level function that puts a single dict on the queue.
+        *args: Arguments passed before the queue.
+
+    Returns:
+        dict: The worker's result, or {"error": ...} if it exited without one.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    worker = context.Process(target=target, args=(*args, queue))
+    worker.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not worker.is_alive():
+                result = {"error": f"worker exited with code {worker.exitcode}"}
+                break
+    worker.join()
+    return result
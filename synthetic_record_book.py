@@ -0,0 +1,276 @@
+#################################################################################################
+#################################################################################################
+'''
+    Generates synthetic record-book pages with known ground truth for benchmarking.
+
+    Each table page carries one of the headers from `TABLE_HEADERS` (step 2) followed by ranked
+    rows in the same layout as the real record book, e.g.
+
+        1. 45 Madre Hill vs. Auburn (186 yards, 1 TD)... 1996
+
+    Names are drawn from player_list.json / team_list.json. Filler pages with narrative text and
+    no table header are mixed in so the classification step has something to discard.
+
+    Noise is a single knob in [0, 1]:
+        - for rendered PDFs it controls speckle, blur and skew of the page images;
+        - for text-only runs `add_ocr_noise` applies OCR-style character confusions, dropped
+          characters and wrapped lines at the same rate.
+'''
+#################################################################################################
+#################################################################################################
+
+import json
+import os
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from stages import REPO_DIR, load_stage
+
+PLAYER_LIST_FILE = os.path.join(REPO_DIR, "output_files", "player_list.json")
+TEAM_LIST_FILE = os.path.join(REPO_DIR, "output_files", "team_list.json")
+
+# Value range and parenthesised detail for each statistic in TABLE_HEADERS
+TABLE_LAYOUTS = {
+    "Rushing Attempts": ((25, 46), "({yards} yards, {td} TD)"),
+    "Pass Attempts": ((40, 60), "({completions} completions)"),
+    "Rushing Yards": ((100, 300), "({attempts} rushes, {td} TD)"),
+}
+
+FILLER_SENTENCES = [
+    "{player} led the Razorbacks in all-purpose yards during the {season} season.",
+    "{player} was named to the All-SEC first team after the win over {team}.",
+    "The {season} squad opened conference play against {team} in Fayetteville.",
+    "{player} earned Offensive Player of the Week honors following the {team} game.",
+]
+
+OCR_CONFUSIONS = {
+    "O": "0", "0": "O", "l": "1", "1": "l", "I": "l", "T": "1", "S": "5", "5": "S",
+    "B": "8", "e": "c", ",": ".", ".": ",", "m": "rn", "A": "4",
+}
+
+
+def load_name_lists(player_list_file=PLAYER_LIST_FILE, team_list_file=TEAM_LIST_FILE):
+    """
+    Loads the player and team name lists used to populate synthetic tables.
+
+    Returns:
+        tuple: (players, teams) as lists of str.
+    """
+    with open(player_list_file, "r") as file:
+        players = json.load(file)
+    with open(team_list_file, "r") as file:
+        teams = json.load(file)
+
+    # Single-token entries such as "Wilson" make poor ground truth
+    players = [player for player in players if " " in player.strip()]
+    return players, teams
+
+
+def _table_page(header, metadata, rows_per_table, players, teams, rng):
+    (low, high), detail = TABLE_LAYOUTS[metadata["statistic"]]
+    values = sorted((rng.randint(low, high) for _ in range(rows_per_table)), reverse=True)
+
+    lines = [f"{header} {metadata['statPeriod'].upper()}"]
+    records = []
+    for rank, value in enumerate(values, start=1):
+        player = rng.choice(players)
+        opponent = rng.choice(teams)
+        season = rng.randint(1960, 2023)
+        location = rng.choice(["vs.", "at"])
+        extra = detail.format(
+            yards=rng.randint(90, 260), td=rng.randint(0, 4),
+            completions=rng.randint(15, 40), attempts=rng.randint(15, 40),
+        )
+        lines.append(f"{rank}. {value} {player} {location} {opponent} {extra}... {season}")
+        records.append({
+            "playerName": player,
+            "opponentName": opponent,
+            "statValue": value,
+            "ranking": rank,
+            "season": season,
+        })
+
+    return "\n".join(lines), records
+
+
+def _filler_page(players, teams, rng):
+    sentences = [
+        rng.choice(FILLER_SENTENCES).format(
+            player=rng.choice(players), team=rng.choice(teams), season=rng.randint(1960, 2023)
+        )
+        for _ in range(rng.randint(4, 10))
+    ]
+    return "\n".join(sentences)
+
+
+def generate_record_book(num_pages, seed=0, table_ratio=0.8, rows_per_table=10, players=None, teams=None):
+    """
+    Generates the text and ground truth of a synthetic record book.
+
+    Parameters:
+        num_pages (int): Number of pages to generate.
+        seed (int): Random seed; the same seed always yields the same book.
+        table_ratio (float): Fraction of pages that carry a table (the rest are filler).
+        rows_per_table (int): Ranked rows per table.
+        players (list): Player names (default: player_list.json).
+        teams (list): Team names (default: team_list.json).
+
+    Returns:
+        list: One dict per page with "page", "text" and "table" (None for filler pages,
+              otherwise {"metadata": ..., "records": [...]}).
+    """
+    if players is None or teams is None:
+        default_players, default_teams = load_name_lists()
+        players = players or default_players
+        teams = teams or default_teams
+
+    table_headers = load_stage("2_classified_tables_headers.py").TABLE_HEADERS
+    headers = [header for header, meta in table_headers.items() if meta["statistic"] in TABLE_LAYOUTS]
+
+    rng = random.Random(seed)
+    pages = []
+    for page in range(1, num_pages + 1):
+        if rng.random() < table_ratio:
+            header = rng.choice(headers)
+            metadata = dict(table_headers[header])
+            text, records = _table_page(header, metadata, rows_per_table, players, teams, rng)
+            table = {"metadata": metadata, "records": records}
+        else:
+            text, table = _filler_page(players, teams, rng), None
+        pages.append({"page": page, "text": text, "table": table})
+
+    return pages
+
+
+def add_ocr_noise(text, noise, seed=0):
+    """
+    Applies OCR-style corruption to clean page text.
+
+    Parameters:
+        text (str): Clean page text.
+        noise (float): Corruption rate in [0, 1]; 0 returns the text unchanged.
+        seed (int): Random seed.
+
+    Returns:
+        str: Corrupted text with character confusions, dropped characters and wrapped lines.
+    """
+    if noise <= 0:
+        return text
+
+    rng = random.Random(seed)
+    char_rate = noise * 0.05
+    lines = []
+    for line in text.split("\n"):
+        chars = []
+        for char in line:
+            roll = rng.random()
+            if roll < char_rate and char in OCR_CONFUSIONS:
+                chars.append(OCR_CONFUSIONS[char])
+            elif roll < char_rate * 1.5:
+                continue
+            else:
+                chars.append(char)
+        line = "".join(chars)
+
+        # Wrap long rows the way OCR splits them across two lines
+        if rng.random() < noise * 0.3 and " " in line:
+            cut = rng.choice([i for i, char in enumerate(line) if char == " "])
+            lines.extend([line[:cut], line[cut + 1:]])
+        else:
+            lines.append(line)
+
+    return "\n".join(lines)
+
+
+def render_page(text, noise=0.0, dpi=150, seed=0):
+    """
+    Renders page text onto a US-letter grayscale image.
+
+    Parameters:
+        text (str): Page text.
+        noise (float): Image degradation in [0, 1] (speckle, blur and skew).
+        dpi (int): Rendering resolution (default: 150).
+        seed (int): Random seed.
+
+    Returns:
+        PIL.Image.Image: Rendered page in "L" mode.
+    """
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    font_size = max(10, dpi // 7)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        font = ImageFont.load_default()
+
+    y = dpi // 2
+    for line in text.split("\n"):
+        draw.text((dpi // 2, y), line, fill=0, font=font)
+        y += int(font_size * 1.6)
+
+    if noise > 0:
+        rng = np.random.default_rng(seed)
+        image = image.rotate(rng.uniform(-2, 2) * noise, fillcolor=255)
+        if noise > 0.2:
+            image = image.filter(ImageFilter.GaussianBlur(radius=noise * 1.2))
+        pixels = np.array(image)
+        speckle = rng.random(pixels.shape) < noise * 0.02
+        pixels[speckle] = rng.choice([0, 255], size=int(speckle.sum()))
+        image = Image.fromarray(pixels)
+
+    return image
+
+
+def render_pdf(pages, pdf_path, noise=0.0, dpi=150, seed=0):
+    """
+    Renders generated pages into an image-only PDF, like a scanned record book.
+
+    Parameters:
+        pages (list): Output of `generate_record_book`.
+        pdf_path (str): Path of the PDF to write.
+        noise (float): Image degradation in [0, 1].
+        dpi (int): Rendering resolution (default: 150).
+        seed (int): Random seed.
+
+    Returns:
+        None
+    """
+    images = [render_page(page["text"], noise, dpi, seed + page["page"]) for page in pages]
+    images[0].save(pdf_path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+
+
+def write_record_book(output_folder, num_pages, noise=0.0, seed=0, dpi=150, **kwargs):
+    """
+    Generates a synthetic record book and writes the PDF plus its ground truth.
+
+    Parameters:
+        output_folder (str): Folder to write "record_book.pdf" and "ground_truth.json" into.
+        num_pages (int): Number of pages.
+        noise (float): Image degradation in [0, 1].
+        seed (int): Random seed.
+        dpi (int): Rendering resolution (default: 150).
+        **kwargs: Passed through to `generate_record_book`.
+
+    Returns:
+        tuple: (pdf_path, ground_truth_path)
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    pages = generate_record_book(num_pages, seed=seed, **kwargs)
+
+    pdf_path = os.path.join(output_folder, "record_book.pdf")
+    render_pdf(pages, pdf_path, noise, dpi, seed)
+
+    ground_truth = [{"page": page["page"], **page["table"]} for page in pages if page["table"]]
+    ground_truth_path = os.path.join(output_folder, "ground_truth.json")
+    with open(ground_truth_path, "w") as outfile:
+        json.dump(ground_truth, outfile, indent=4)
+
+    print(f"Synthetic record book saved to {pdf_path} with ground truth in {ground_truth_path}")
+    return pdf_path, ground_truth_path
+
+
+if __name__ == "__main__":
+    write_record_book("synthetic_record_book", num_pages=20, noise=0.2, seed=0)